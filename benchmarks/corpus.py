@@ -0,0 +1,71 @@
+import os
+import random
+
+# 典型的字幕组发布命名：剧集合集、电影、SP/OVA/NCOP 等特典，固定种子保证每次生成相同的语料
+GROUPS = ["Airota", "LoliHouse", "Nekomoe kissaten", "SweetSub", "Sakurato", "ANi", "NC-Raws", "VCB-Studio",
+          "Lilith-Raws", "DBD-Raws", "Kamigami", "Skymoon-Raws", "Moozzi2", "SubsPlease", "Erai-raws"]
+SERIES = [
+    ("葬送的芙莉莲", "Sousou no Frieren"), ("间谍过家家", "SPY x FAMILY"), ("孤独摇滚！", "Bocchi the Rock!"),
+    ("无职转生", "Mushoku Tensei"), ("咒术回战", "Jujutsu Kaisen"), ("药屋少女的呢喃", "Kusuriya no Hitorigoto"),
+    ("迷宫饭", "Dungeon Meshi"), ("我推的孩子", "Oshi no Ko"), ("进击的巨人", "Shingeki no Kyojin"),
+    ("紫罗兰永恒花园", "Violet Evergarden"), ("辉夜大小姐想让我告白", "Kaguya-sama wa Kokurasetai"),
+    ("鬼灭之刃", "Kimetsu no Yaiba"), ("夏日重现", "Summertime Render"), ("排球少年！！", "Haikyuu!!"),
+]
+MOVIES = [
+    ("铃芽之旅", "Suzume no Tojimari", 2022), ("你的名字。", "Kimi no Na wa.", 2016),
+    ("天气之子", "Tenki no Ko", 2019), ("声之形", "Koe no Katachi", 2016), ("千与千寻", "Sen to Chihiro no Kamikakushi", 2001),
+]
+RESOLUTIONS = ["1080p", "720p", "2160p", "1080P", "BDRip 1080p"]
+VIDEO = ["x265", "HEVC", "x264", "AVC", "HEVC-10bit", "Ma10p"]
+AUDIO = ["AAC", "FLAC", "FLACx2", "AC3"]
+SUBS = ["简繁内封", "CHS", "CHT", "简日双语", "GB", "BIG5", "ENG"]
+EXTS = [".mkv", ".mkv", ".mkv", ".mp4"]
+
+def _episode_name(rng):
+    group = rng.choice(GROUPS)
+    cn, en = rng.choice(SERIES)
+    title = rng.choice([cn, en, f"{cn} {en}"])
+    season = rng.choice(["", "", " S2", " 第二季", " Season 3", " II"])
+    ep = rng.randint(1, 26)
+    ep_text = rng.choice([f" - {ep:02d}", f" [{ep:02d}]", f" 第{ep}话", f" - {ep:02d}v2", f" E{ep:02d}"])
+    tags = f"[{rng.choice(RESOLUTIONS)}][{rng.choice(VIDEO)}][{rng.choice(AUDIO)}][{rng.choice(SUBS)}]"
+    if rng.random() < 0.5:
+        return f"[{group}] {title}{season}{ep_text} {tags}{rng.choice(EXTS)}"
+    return f"[{group}][{en.replace(' ', '_')}]{season.strip()}[{ep:02d}][{rng.choice(RESOLUTIONS)}][{rng.choice(SUBS)}]{rng.choice(EXTS)}"
+
+def _movie_name(rng):
+    cn, en, year = rng.choice(MOVIES)
+    if rng.random() < 0.5:
+        return f"[{rng.choice(GROUPS)}] {cn} {en} ({year}) [{rng.choice(RESOLUTIONS)}][{rng.choice(VIDEO)}]{rng.choice(EXTS)}"
+    return f"{en.replace(' ', '.')}.{year}.{rng.choice(['1080p', '2160p'])}.BluRay.{rng.choice(VIDEO)}-{rng.choice(GROUPS)}{rng.choice(EXTS)}"
+
+def _special_name(rng):
+    cn, en = rng.choice(SERIES)
+    kind = rng.choice(["SP", "OVA", "OAD", "NCOP", "NCED", "Menu", "PV"])
+    n = rng.randint(1, 6)
+    return f"[{rng.choice(GROUPS)}] {en} [{kind}{n:02d}][{rng.choice(RESOLUTIONS)}][{rng.choice(VIDEO)}]{rng.choice(EXTS)}"
+
+def generate_corpus(count=2000, seed=20240101, movie_ratio=0.1, special_ratio=0.1):
+    """生成 count 个不重复的文件名 (剧集/电影/特典按比例混合)，相同参数总是得到相同结果"""
+    rng = random.Random(seed)
+    names, seen = [], set()
+    attempts = 0
+    while len(names) < count and attempts < count * 20:
+        attempts += 1
+        r = rng.random()
+        name = _movie_name(rng) if r < movie_ratio else _special_name(rng) if r < movie_ratio + special_ratio else _episode_name(rng)
+        if name not in seen:
+            seen.add(name)
+            names.append(name)
+    return names
+
+def materialize(directory, names):
+    """在 directory 下创建对应的空文件 (路径规划与结果缓存需要真实的 stat)，返回完整路径列表"""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name in names:
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            open(path, "wb").close()
+        paths.append(path)
+    return paths
@@ -0,0 +1,241 @@
+"""
+离线基准测试入口 (在仓库根目录执行):
+
+    python -m benchmarks.run --files 2000 --out bench.json
+    python -m benchmarks.run --baseline bench.json --threshold 0.2
+    python -m benchmarks.run --only recognize_cloud --latency 120 --jitter 60 --rate-429 0.02
+
+云端基准默认走本地替身服务器 (standin_server)，无需 API Key 与网络；传入 --live 与 --tmdb-key 时请求真实接口。
+
+结果为 JSON：meta 记录环境与内核版本，results 下每项含 files_per_sec 与各阶段 p50/p95/max (毫秒)。
+传入 --baseline 时与上次结果比较吞吐，任一项下降超过阈值即以非零状态退出。
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("VIDEO_RENAMER_ROOT", ROOT)
+sys.path.insert(0, ROOT)
+
+from benchmarks.corpus import generate_corpus, materialize
+from benchmarks.standin_server import StandinServer, Cassette
+from src.utils.tracing import percentile
+
+# 基准使用固定的格式串，与界面默认值一致，避免受本机配置影响
+FORMATS = {
+    "rename_format": "S{season_02}E{episode_02} - {filename}",
+    "folder_format": "({year}){title}[tmdbid={tmdb_id}]",
+    "season_format": "Season {season}",
+    "movie_format": "{title} ({year}) [{resolution}][{video_encode}]",
+    "movie_folder_format": "({year}){title}[tmdbid={tmdb_id}]",
+}
+
+def _stage_summary(tracer):
+    return {name: {"count": s["count"], "total_ms": s["total"] * 1000, "p50_ms": s["p50"] * 1000,
+                   "p95_ms": s["p95"] * 1000, "max_ms": s["max"] * 1000}
+            for name, s in tracer.summary().items()}
+
+def _latency_summary(values):
+    values = sorted(values)
+    return {"p50_ms": percentile(values, 50) * 1000, "p95_ms": percentile(values, 95) * 1000,
+            "max_ms": (values[-1] if values else 0.0) * 1000}
+
+def bench_recognition(paths, config_data):
+    """RecognitionProcessor + BatchPlanner 整批识别 (不使用结果缓存)"""
+    from src.core.processor import RecognitionProcessor
+    from src.core.planner import BatchPlanner
+    processor = RecognitionProcessor(config_data)
+    if not processor._get_core_components([]):
+        return {"skipped": "内核未就绪 (anime-matcher-main 不存在或加载失败)"}
+
+    async def run():
+        results = []
+        try:
+            async for path, result in BatchPlanner(processor).iter_recognize(paths):
+                results.append(result)
+        finally:
+            await processor.aclose()
+        return results
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    recognized = sum(1 for r in results if "path" in r.to_dict())
+    return {"files": len(paths), "recognized": recognized, "seconds": elapsed,
+            "files_per_sec": len(paths) / elapsed if elapsed else 0.0, "stages": _stage_summary(processor.tracer)}
+
+def bench_cloud(paths, config_data, args):
+    """经替身服务器的整批云端识别：按给定的延迟/抖动/429/超时观察并发、连接池与合并请求的表现"""
+    server = StandinServer(cassette=Cassette(args.cassette), latency=args.latency, jitter=args.jitter,
+                           rate_429=args.rate_429, rate_timeout=args.rate_timeout, timeout_delay=args.timeout_delay,
+                           seed=args.seed).start()
+    try:
+        result = bench_recognition(paths, dict(config_data, with_cloud=True, tmdb_api_key="standin",
+                                               cloud_base_url=server.url))
+    finally:
+        server.stop()
+    if "skipped" in result:
+        return result
+    if not server.stats["requests"]:
+        raise RuntimeError("替身服务器未收到任何请求：云端请求没有经过 cloud_base_url，本次数据不是替身环境下的结果")
+    result["server"] = dict(server.stats, latency_ms=args.latency, jitter_ms=args.jitter,
+                            rate_429=args.rate_429, rate_timeout=args.rate_timeout)
+    return result
+
+def _synthetic_result(path, i):
+    from src.core.processor import RecognitionResult
+    movie = i % 10 == 0
+    data = {
+        "title": f"Series {i % 40}", "tmdb_id": str(100000 + i % 40), "category": "电影" if movie else "剧集",
+        "processed_name": "", "poster_path": "", "release_date": "2024-01-01", "season": 1 + i % 3,
+        "episode": str(1 + i % 24), "team": "Airota", "resolution": "1080p", "video_encode": "x265",
+        "video_effect": "", "audio_encode": "FLAC", "subtitle": "CHS", "source": "WebRip", "platform": "",
+        "origin_country": "日本", "vote_average": 8.1, "year": "2024", "duration": "0.01s",
+        "filename": os.path.basename(path), "path": path
+    }
+    return RecognitionResult(data, [])
+
+def bench_build_paths(paths, out_dir):
+    """RenameEngine.build_paths 与整批路径规划 (含冲突检测)"""
+    from src.core.renamer import RenameEngine
+    from src.core.plan import RenamePlan
+    renamer = RenameEngine(regex_rules=[(r"(?i)\[(?:CHS|CHT|GB|BIG5)\]", ""), ("v2", "")], **FORMATS)
+    results = [(p, _synthetic_result(os.path.join(out_dir, os.path.basename(p)), i)) for i, p in enumerate(paths)]
+    latencies = []
+    start = time.perf_counter()
+    for path, result in results:
+        t0 = time.perf_counter()
+        renamer.build_paths(path, result, {})
+        latencies.append(time.perf_counter() - t0)
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    plan = renamer.build_plan(results, {}, RenamePlan())
+    plan_seconds = time.perf_counter() - start
+    return {"files": len(paths), "seconds": build_seconds, "files_per_sec": len(paths) / build_seconds if build_seconds else 0.0,
+            "latency": _latency_summary(latencies), "plan_seconds": plan_seconds,
+            "plan_files_per_sec": len(paths) / plan_seconds if plan_seconds else 0.0,
+            "conflicts": len(plan.conflicts())}
+
+def bench_rules(db_path, subscriptions, lines_per_sub, repeat=5, seed=7):
+    """大量订阅下的 RuleManager.get_merged_rules 与快照构建 (使用临时数据库)"""
+    import random
+    from src.utils import database
+    from src.core.rules import RuleManager, RULE_CATEGORIES
+    database.db.init(db_path)
+    database.init_db()
+    rng = random.Random(seed)
+    vocabulary = [f"rule-{n}" for n in range(lines_per_sub * 4)]  # 订阅之间约有一半的重复行
+    for sub in range(subscriptions):
+        for category in RULE_CATEGORIES:
+            content = "\n".join(rng.sample(vocabulary, lines_per_sub))
+            database.replace_rule_lines(category, f"sub:{sub}", content)
+
+    merged, snapshots = [], []
+    for _ in range(repeat):
+        for category in RULE_CATEGORIES:
+            t0 = time.perf_counter()
+            lines = RuleManager.get_merged_rules(category)
+            merged.append(time.perf_counter() - t0)
+        RuleManager.invalidate()
+        t0 = time.perf_counter()
+        RuleManager.get_snapshot()
+        snapshots.append(time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    RuleManager.get_snapshot()
+    warm = time.perf_counter() - t0
+    database.db.close()
+    return {"subscriptions": subscriptions, "lines_per_sub": lines_per_sub, "merged_lines": len(lines),
+            "get_merged_rules": _latency_summary(merged), "snapshot_cold": _latency_summary(snapshots),
+            "snapshot_warm_ms": warm * 1000}
+
+def _meta(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "commit": commit, "python": platform.python_version(),
+            "platform": platform.platform(), "cpu_count": os.cpu_count(), "args": vars(args)}
+
+def compare(current, baseline, threshold):
+    """返回吞吐下降超过阈值的条目 [(名称, 基线, 当前)]"""
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name, {})
+        for key in ("files_per_sec", "plan_files_per_sec"):
+            if key in result and base.get(key):
+                if result[key] < base[key] * (1 - threshold):
+                    regressions.append((f"{name}.{key}", base[key], result[key]))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="识别与重命名流程的离线基准测试")
+    parser.add_argument("--files", type=int, default=2000, help="语料文件数")
+    parser.add_argument("--seed", type=int, default=20240101, help="语料随机种子")
+    parser.add_argument("--l1-processes", type=int, default=0, help="L1 识别进程数")
+    parser.add_argument("--concurrency", type=int, default=8, help="云端并发数")
+    parser.add_argument("--live", action="store_true", help="云端基准请求真实接口 (需要 --tmdb-key)")
+    parser.add_argument("--tmdb-key", default=os.environ.get("TMDB_API_KEY", ""), help="联网基准使用的 TMDB API Key")
+    parser.add_argument("--cassette", help="替身服务器回放的录像文件，未命中的请求合成应答")
+    parser.add_argument("--latency", type=float, default=80.0, help="替身服务器的基础延迟 (毫秒)")
+    parser.add_argument("--jitter", type=float, default=40.0, help="替身服务器的延迟抖动 (毫秒)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="替身服务器返回 429 的概率")
+    parser.add_argument("--rate-timeout", type=float, default=0.0, help="替身服务器挂起不应答的概率")
+    parser.add_argument("--timeout-delay", type=float, default=20.0, help="模拟超时时挂起的秒数")
+    parser.add_argument("--subscriptions", type=int, default=50, help="规则基准的订阅数")
+    parser.add_argument("--rule-lines", type=int, default=2000, help="每个订阅每个分类的规则行数")
+    parser.add_argument("--only", nargs="*", choices=["recognize_local", "recognize_cloud", "build_paths", "rules"],
+                        help="只运行指定的基准")
+    parser.add_argument("--out", help="结果 JSON 输出路径 (默认输出到标准输出)")
+    parser.add_argument("--baseline", help="用于比较的上次结果 JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="吞吐下降超过该比例视为退化")
+    args = parser.parse_args(argv)
+    selected = set(args.only or ["recognize_local", "recognize_cloud", "build_paths", "rules"])
+
+    report = {"meta": _meta(args), "results": {}}
+    with tempfile.TemporaryDirectory(prefix="renamer-bench-") as tmp:
+        paths = materialize(os.path.join(tmp, "corpus"), generate_corpus(args.files, args.seed))
+        base_config = {"use_storage": False, "anime_priority": True, "bgm_failover": False,
+                       "l1_processes": args.l1_processes, "max_concurrency": args.concurrency}
+        if "recognize_local" in selected:
+            report["results"]["recognize_local"] = bench_recognition(paths, dict(base_config, with_cloud=False))
+        if "recognize_cloud" in selected:
+            if not args.live:
+                report["results"]["recognize_cloud"] = bench_cloud(paths, base_config, args)
+            elif args.tmdb_key:
+                report["results"]["recognize_cloud"] = bench_recognition(
+                    paths, dict(base_config, with_cloud=True, tmdb_api_key=args.tmdb_key))
+            else:
+                report["results"]["recognize_cloud"] = {"skipped": "--live 需要 TMDB API Key"}
+        if "build_paths" in selected:
+            report["results"]["build_paths"] = bench_build_paths(paths, os.path.join(tmp, "library"))
+        if "rules" in selected:
+            report["results"]["rules"] = bench_rules(os.path.join(tmp, "rules.db"), args.subscriptions, args.rule_lines)
+    from src.core.kernel import kernel_registry
+    report["meta"]["kernel_version"] = kernel_registry.version  # 识别基准运行后才有内核版本指纹
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"结果已写入 {args.out}")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for name, base, current in regressions:
+            print(f"[退化] {name}: {base:.1f} -> {current:.1f}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""
+TMDB / Bangumi 的本地替身服务器 (录制 / 回放)。
+
+请求路径的第一段是原始主机名 (由 HttpClientPool 的 RedirectTransport 改写而来)：
+    GET /api.themoviedb.org/3/search/tv?query=... -> 回放 cassette 中 api.themoviedb.org 的对应响应
+
+    python -m benchmarks.standin_server --cassette tmdb.json --latency 80 --jitter 40 --rate-429 0.02
+    python -m benchmarks.standin_server --cassette tmdb.json --record      # 转发到真实接口并录制
+
+然后把设置中的 "云端替身地址" (cloud_base_url) 指向 http://127.0.0.1:8765 即可。
+"""
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qsl, urlencode, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# 不参与匹配、也不写入 cassette 的凭据参数
+SECRET_PARAMS = {"api_key", "access_token", "token"}
+NOT_FOUND = {"status_code": 34, "status_message": "The resource you requested could not be found."}
+
+class Cassette:
+    """以 "方法 主机/路径?排序后的查询" 为键的响应录像，JSON 文件存储"""
+    def __init__(self, path=None):
+        self.path = path
+        self.interactions = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for item in json.load(f).get("interactions", []):
+                    self.interactions[item["key"]] = item
+
+    @staticmethod
+    def key(method, host, path, query):
+        params = sorted((k, v) for k, v in parse_qsl(query, keep_blank_values=True) if k not in SECRET_PARAMS)
+        return f"{method} {host}{path}" + (f"?{urlencode(params)}" if params else "")
+
+    def get(self, key):
+        return self.interactions.get(key)
+
+    def put(self, key, status, content_type, body):
+        with self._lock:
+            self.interactions[key] = {"key": key, "status": status, "content_type": content_type,
+                                      "body": body.decode("utf-8", "replace")}
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {"interactions": sorted(self.interactions.values(), key=lambda i: i["key"])}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+def _stable_id(text):
+    return 100000 + int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16) % 900000
+
+def synthesize(host, path, query):
+    """cassette 未命中时按接口形状生成确定性的应答，返回 (状态码, dict)；无法模拟的接口返回 404"""
+    params = dict(parse_qsl(query))
+    parts = [unquote(p) for p in path.strip("/").split("/")]
+    if host.endswith("themoviedb.org") and len(parts) >= 3 and parts[0] == "3":
+        if parts[1] == "search":
+            name = params.get("query", "")
+            if not name:
+                return 200, {"page": 1, "results": [], "total_results": 0}
+            media = "movie" if parts[2] == "movie" else "tv"
+            item = {"id": _stable_id(f"{media}:{name}"), "media_type": media, "genre_ids": [16],
+                    "origin_country": ["JP"], "original_language": "ja", "popularity": 50.0, "vote_average": 8.0,
+                    "poster_path": "/standin.jpg", "overview": ""}
+            if media == "movie":
+                item.update(title=name, original_title=name, release_date=f"{params.get('year') or 2020}-01-01")
+            else:
+                item.update(name=name, original_name=name, first_air_date=f"{params.get('first_air_date_year') or 2020}-01-01")
+            return 200, {"page": 1, "results": [item], "total_results": 1}
+        if parts[1] in ("tv", "movie") and parts[2].isdigit():
+            tmdb_id = int(parts[2])
+            if len(parts) > 3:  # alternative_titles / external_ids / season 等附属接口
+                return 200, {"id": tmdb_id, "results": [], "titles": []}
+            detail = {"id": tmdb_id, "genres": [{"id": 16, "name": "动画"}], "origin_country": ["JP"],
+                      "original_language": "ja", "vote_average": 8.0, "poster_path": "/standin.jpg", "overview": ""}
+            if parts[1] == "movie":
+                detail.update(title=f"Movie {tmdb_id}", original_title=f"Movie {tmdb_id}", release_date="2020-01-01")
+            else:
+                detail.update(name=f"Series {tmdb_id}", original_name=f"Series {tmdb_id}", first_air_date="2020-01-01",
+                              number_of_seasons=1, seasons=[{"season_number": 1, "episode_count": 24}])
+            return 200, detail
+    if host.endswith("bgm.tv") and parts:
+        if parts[0] == "search" and len(parts) >= 3:
+            name = parts[2]
+            return 200, {"results": 1, "list": [{"id": _stable_id(f"bgm:{name}"), "type": 2, "name": name,
+                                                 "name_cn": name, "air_date": "2020-01-01"}]}
+        if parts[0] == "v0" and len(parts) >= 3 and parts[1] == "subjects" and parts[2].isdigit():
+            subject_id = int(parts[2])
+            return 200, {"id": subject_id, "type": 2, "name": f"Subject {subject_id}", "name_cn": f"条目 {subject_id}",
+                         "date": "2020-01-01", "infobox": []}
+    return 404, NOT_FOUND
+
+class StandinServer(ThreadingHTTPServer):
+    """
+    回放优先，未命中时可选择合成应答 (synthesize) 或转发录制 (record)。
+    每个请求先按 latency ± jitter 毫秒延迟，再按概率注入 429 或超时 (挂起 timeout_delay 秒后断开)。
+    """
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), cassette=None, latency=0.0, jitter=0.0, rate_429=0.0,
+                 rate_timeout=0.0, timeout_delay=20.0, record=False, synthesize=True, seed=None):
+        super().__init__(address, _Handler)
+        self.cassette = cassette or Cassette()
+        self.latency, self.jitter = latency / 1000.0, jitter / 1000.0
+        self.rate_429, self.rate_timeout, self.timeout_delay = rate_429, rate_timeout, timeout_delay
+        self.record, self.synthesize = record, synthesize
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._upstream = None
+        self.stats = {"requests": 0, "replayed": 0, "synthesized": 0, "recorded": 0, "missing": 0,
+                      "throttled": 0, "timeouts": 0}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def draw(self):
+        """返回 (延迟秒, 注入的故障 None/"429"/"timeout")"""
+        with self._lock:
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            r = self._rng.random()
+        if r < self.rate_timeout:
+            return delay, "timeout"
+        if r < self.rate_timeout + self.rate_429:
+            return delay, "429"
+        return delay, None
+
+    def forward(self, method, host, path, query, headers, body):
+        """record 模式：转发到真实接口 (携带原始凭据)，返回 (状态码, content-type, 响应体)"""
+        import httpx
+        with self._lock:
+            if self._upstream is None:
+                self._upstream = httpx.Client(timeout=30.0, follow_redirects=True)
+        url = f"https://{host}{path}" + (f"?{query}" if query else "")
+        resp = self._upstream.request(method, url, headers=headers, content=body)
+        return resp.status_code, resp.headers.get("content-type", "application/json"), resp.content
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="standin-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._upstream is not None:
+            self._upstream.close()
+        if self.record:
+            self.cassette.save()
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 保持长连接，连接池复用才有意义
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json;charset=utf-8", headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self):
+        server = self.server
+        server.count("requests")
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0)) or None
+        url = urlsplit(self.path)
+        host, _, rest = url.path.lstrip("/").partition("/")
+        path = "/" + rest
+        if not host:
+            return self._send(400, {"status_message": "missing upstream host in path"})
+
+        delay, fault = server.draw()
+        if delay:
+            time.sleep(delay)
+        if fault == "timeout":
+            server.count("timeouts")
+            time.sleep(server.timeout_delay)
+            self.close_connection = True
+            return
+        if fault == "429":
+            server.count("throttled")
+            return self._send(429, {"status_code": 25, "status_message": "Your request count is over the allowed limit."},
+                              headers={"Retry-After": "1"})
+
+        key = Cassette.key(self.command, host, path, url.query)
+        hit = server.cassette.get(key)
+        if hit:
+            server.count("replayed")
+            return self._send(hit["status"], hit["body"].encode("utf-8"), hit["content_type"])
+        if server.record:
+            headers = {k: v for k, v in self.headers.items() if k.lower() in ("authorization", "accept", "content-type", "user-agent")}
+            try:
+                status, content_type, content = server.forward(self.command, host, path, url.query, headers, body)
+            except Exception as e:
+                return self._send(502, {"status_message": f"upstream error: {e}"})
+            server.cassette.put(key, status, content_type, content)
+            server.count("recorded")
+            return self._send(status, content, content_type)
+        if server.synthesize:
+            status, data = synthesize(host, path, url.query)
+            server.count("synthesized" if status == 200 else "missing")
+            return self._send(status, data)
+        server.count("missing")
+        return self._send(404, NOT_FOUND)
+
+    do_GET = do_POST = _handle
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="TMDB / Bangumi 本地替身服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cassette", help="录像文件 (JSON)")
+    parser.add_argument("--record", action="store_true", help="未命中时转发到真实接口并写入录像")
+    parser.add_argument("--no-synthesize", action="store_true", help="未命中时直接返回 404，而不是合成应答")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的基础延迟 (毫秒)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="延迟抖动幅度 (毫秒)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="返回 429 的概率")
+    parser.add_argument("--rate-timeout", type=float, default=0.0, help="挂起不应答的概率")
+    parser.add_argument("--timeout-delay", type=float, default=20.0, help="模拟超时时挂起的秒数")
+    parser.add_argument("--seed", type=int, help="故障注入的随机种子")
+    args = parser.parse_args(argv)
+
+    server = StandinServer((args.host, args.port), Cassette(args.cassette), args.latency, args.jitter, args.rate_429,
+                           args.rate_timeout, args.timeout_delay, args.record, not args.no_synthesize, args.seed)
+    print(f"替身服务器已启动: {server.url} (录像: {args.cassette or '无'}{', 录制模式' if args.record else ''})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.record:
+            server.cassette.save()
+        print(json.dumps(server.stats, ensure_ascii=False))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
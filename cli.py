@@ -0,0 +1,402 @@
+"""
+无界面的命令行批处理入口，不导入 PyQt6：
+
+    python cli.py /downloads/anime                     # 预览：逐文件输出 JSONL 计划
+    python cli.py --apply --mode link /downloads/anime  # 按计划执行 (链接方式整理)
+    find /downloads -name '*.mkv' | python cli.py --from-file - --apply
+    python cli.py --undo                               # 撤销最近一次执行
+    python cli.py --watch --apply /downloads/anime      # 常驻监控，新文件写入完成后自动整理
+
+读取与图形界面相同的 VideoRenamer_Qt6.ini。标准输出只写 JSONL (每行一个 type 为
+plan / rename / undo / summary，监控模式下另有 watch / batch 的对象)，日志写到标准错误。
+"""
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import argparse
+import threading
+import multiprocessing
+from collections import OrderedDict
+
+# 监控模式记住的已处理路径上限 (最久未触及的先淘汰)；只需覆盖本程序改名/链接后紧接着到达的事件
+HANDLED_LIMIT = 20000
+
+def _emit(out, **record):
+    out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    out.flush()
+
+def _log(verbose, line):
+    if verbose or not line.startswith(("[DEBUG]", "[INFO]")):
+        print(line, file=sys.stderr)
+
+def _read_path_list(source):
+    stream = sys.stdin if source == "-" else open(source, "r", encoding="utf-8")
+    try:
+        return [line.rstrip("\r\n") for line in stream if line.strip()]
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+def _collect_paths(args, config_data):
+    from src.utils.scanner import scan_videos
+    files, roots = [], []
+    for path in args.paths + (_read_path_list(args.from_file) if args.from_file else []):
+        path = os.path.abspath(path)
+        (roots if os.path.isdir(path) else files).append(path)
+    for batch in scan_videos(roots, skip_dirs=config_data.get('scan_skip_dirs')):
+        files.extend(batch)
+    return list(dict.fromkeys(files))
+
+def _apply_overrides(config_data, args):
+    from src.core.settings import DEFAULTS
+    for item in args.set or []:
+        key, _, value = item.partition("=")
+        default = DEFAULTS.get(key)
+        if isinstance(default, bool):
+            value = value.strip().lower() in ("1", "true", "yes", "on")
+        elif isinstance(default, int):
+            value = int(value)
+        config_data[key] = value
+    if args.mode:
+        config_data['organize_mode'] = args.mode
+    if args.stable_seconds is not None:
+        config_data['watch_stable_seconds'] = args.stable_seconds
+    if args.no_cloud:
+        config_data['with_cloud'] = False
+    if args.no_cache:
+        config_data['result_cache'] = False
+    custom = {}
+    if args.season is not None:
+        custom.update(custom_season_enabled=True, custom_season_value=str(args.season))
+    if args.episode_offset is not None:
+        custom.update(custom_episode_offset_enabled=True, custom_episode_offset_value=str(args.episode_offset))
+    if args.tmdb_id:
+        custom.update(tmdb_id_override=args.tmdb_id, media_type_override=args.media_type)
+    config_data['custom_settings'] = custom
+    return config_data
+
+async def _plan_batch(processor, renamer, plan, paths, config_data, out, args):
+    from src.core.planner import BatchPlanner
+    from src.utils.result_cache import ResultCache
+    cache = ResultCache() if config_data.get('result_cache', True) else None
+    batch = BatchPlanner(processor).iter_recognize(paths, concurrency=config_data.get('max_concurrency'), cache=cache)
+    try:
+        async for path, rec_result in batch:
+            with processor.tracer.span("rename.build_paths", path):
+                item = renamer.plan_file(plan, path, rec_result, config_data.get('custom_settings'))
+            record = dict(type="plan", source=item.source, target=item.target, main_folder=item.main_folder,
+                          season_folder=item.season_folder, status=item.status, message=item.message,
+                          result=rec_result.to_dict())
+            if args.logs:
+                record["logs"] = rec_result.logs
+            _emit(out, **record)
+    finally:
+        await batch.aclose()
+        if cache:
+            _log(args.verbose, f"[INFO] 识别结果缓存: 命中 {cache.hits} / 未命中 {cache.misses}")
+            cache.close()
+
+def _apply_plan(plan, renamer, config_data, out):
+    """执行计划中就绪且源文件未变化的条目，逐条输出 rename 记录；返回 (结果列表, 执行日志)"""
+    from src.core.plan import STATUS_READY
+    from src.core.executor import BatchExecutor
+    mode = config_data.get('organize_mode', 'move')
+    pairs = [(item.source, item.target) for item in plan.items if item.status == STATUS_READY and not item.is_stale()]
+    if not pairs:
+        return [], None
+    lock = threading.Lock()
+
+    def on_result(old_path, new_path, ok, msg):
+        with lock:
+            _emit(out, type="rename", source=old_path, target=new_path, ok=ok, message=msg)
+
+    move = lambda old, new: renamer.execute_rename(old, new, make_dirs=False, mode=mode)
+    journal, results = BatchExecutor(config_data.get('rename_workers', 8)).execute(pairs, move, on_result=on_result, mode=mode)
+    return results, journal
+
+def run_batch(args, config_data, out):
+    from src.core.processor import RecognitionProcessor
+    from src.core.renamer import RenameEngine
+    from src.core.template import TemplateError
+    from src.core.plan import RenamePlan
+
+    started = time.perf_counter()
+    paths = _collect_paths(args, config_data)
+    if not paths:
+        _log(True, "[ERROR] 没有找到待处理的视频文件")
+        return 2
+    try:
+        renamer = RenameEngine.from_config(config_data)
+    except TemplateError as e:
+        _log(True, f"[ERROR] 重命名格式无效: {str(e)}")
+        return 2
+    for err in renamer.regex_chain.errors:
+        _log(True, f"[WARN] 噪声清洗{err}，已跳过")
+
+    plan = RenamePlan(config_data)
+    processor = RecognitionProcessor(config_data)
+    for line in processor.prepare():
+        _log(args.verbose, line)
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(_plan_batch(processor, renamer, plan, paths, config_data, out, args))
+    finally:
+        loop.run_until_complete(processor.aclose())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+    counts = {}
+    for item in plan.items:
+        counts[item.status] = counts.get(item.status, 0) + 1
+    summary = dict(type="summary", files=len(paths), planned=counts, applied=args.apply)
+
+    if args.apply:
+        results, journal = _apply_plan(plan, renamer, config_data, out)
+        summary.update(renamed=sum(1 for r in results if r[2]), errors=sum(1 for r in results if not r[2]),
+                       journal=journal.path if journal else None)
+
+    if args.verbose:
+        for line in processor.tracer.summary_lines():
+            _log(True, f"[INFO] [性能] {line}")
+    if config_data.get('trace_export') and processor.tracer.spans:
+        summary["trace"] = processor.tracer.export_chrome()
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    _emit(out, **summary)
+    return 1 if summary.get("errors") else 0
+
+def _remember(handled, path, fingerprint):
+    handled[path] = fingerprint
+    handled.move_to_end(path)
+    while len(handled) > HANDLED_LIMIT:
+        handled.popitem(last=False)
+
+def _rules_digest():
+    from src.core.rules import RuleManager
+    RuleManager.invalidate()  # 规则可能由图形界面等其他进程写入数据库，强制重新读取
+    return RuleManager.get_snapshot().digest
+
+async def _watch_batch(processor, renamer, paths, config_data, out, args, handled):
+    """对一组已写入完成的文件走一遍 识别 → 路径规划 → 执行，处理过的源文件与产出的目标记入 handled"""
+    from src.core.plan import RenamePlan, file_fingerprint
+    started = time.perf_counter()
+    plan = RenamePlan(config_data)
+    await _plan_batch(processor, renamer, plan, paths, config_data, out, args)
+    for path in paths:
+        _remember(handled, path, file_fingerprint(path))
+    counts = {}
+    for item in plan.items:
+        counts[item.status] = counts.get(item.status, 0) + 1
+    summary = dict(type="batch", files=len(paths), planned=counts, applied=args.apply)
+    if args.apply:
+        # 文件操作放到线程池，事件循环 (HTTP 长连接) 不被阻塞
+        results, journal = await asyncio.get_running_loop().run_in_executor(None, _apply_plan, plan, renamer, config_data, out)
+        for _, new_path, ok, _ in results:
+            if ok:
+                _remember(handled, new_path, file_fingerprint(new_path))
+        summary.update(renamed=sum(1 for r in results if r[2]), errors=sum(1 for r in results if not r[2]),
+                       journal=journal.path if journal else None)
+    if args.verbose:
+        for line in processor.tracer.summary_lines():
+            _log(True, f"[INFO] [性能] {line}")
+    processor.tracer.pop_all()  # 常驻进程按批次清空计时与合并表，避免无限增长
+    processor.reset_flights()
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    _emit(out, **summary)
+
+async def _watch_loop(args, load_config, config_data, roots, renamer, out):
+    from src.core.processor import RecognitionProcessor
+    from src.core.renamer import RenameEngine
+    from src.core.template import TemplateError
+    from src.core.plan import file_fingerprint, config_key
+    from src.utils.scanner import scan_videos
+    from src.utils.watcher import create_watcher, StabilityTracker, is_video
+
+    def start_processor(config_data):
+        processor = RecognitionProcessor(config_data)
+        for line in processor.prepare():
+            _log(args.verbose, line)
+        return processor
+
+    # 处理器在规则与配置不变期间常驻：内核、规则快照、L1 进程池与 HTTP 连接池跨批次复用
+    processor = start_processor(config_data)
+    rules_digest = _rules_digest()
+    skip_dirs = config_data.get('scan_skip_dirs')
+    watcher, fallback = create_watcher(roots, skip_dirs, args.poll_interval)
+    if fallback:
+        _log(True, f"[WARN] inotify 不可用 ({fallback})，改为每 {args.poll_interval:g} 秒轮询")
+    tracker = StabilityTracker(config_data.get('watch_stable_seconds', 10))
+    handled = OrderedDict()  # 已处理的源文件与本程序产出的目标 -> 指纹，重复事件直接忽略
+    started = time.time()
+
+    def track(path):
+        if not is_video(path):
+            return
+        fingerprint = file_fingerprint(path)
+        if path in handled:
+            if handled[path] == fingerprint:
+                return
+            del handled[path]  # 已删除或再次被修改，不再视为已处理
+        tracker.touch(path)
+
+    async def refresh():
+        """每组批次开始前检查配置文件与规则库，有变化时重建处理器与重命名引擎"""
+        nonlocal processor, renamer, config_data, rules_digest
+        new_config, digest = load_config(), _rules_digest()
+        if digest == rules_digest and config_key(new_config) == config_key(config_data):
+            return
+        if new_config.get('watch_dirs') != config_data.get('watch_dirs') and not args.paths:
+            _log(True, "[WARN] 设置中的监控目录已变更，需重启监控后生效")
+        try:
+            new_renamer = RenameEngine.from_config(new_config)
+        except TemplateError as e:
+            _log(True, f"[ERROR] 新的重命名格式无效: {str(e)}，继续使用原配置")
+            return
+        _log(True, f"[INFO] 检测到{'规则' if digest != rules_digest else '配置'}变更，重新加载识别处理器")
+        await processor.aclose()
+        processor, renamer, config_data, rules_digest = start_processor(new_config), new_renamer, new_config, digest
+        tracker.window = config_data.get('watch_stable_seconds', 10)
+
+    loop = asyncio.get_running_loop()
+    wake, stop = asyncio.Event(), asyncio.Event()
+    fd = watcher.fileno()
+    if fd is not None:
+        loop.add_reader(fd, wake.set)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, lambda: (stop.set(), wake.set()))
+        except (NotImplementedError, RuntimeError, ValueError):
+            pass
+
+    if args.scan_existing:
+        for batch in scan_videos(roots, skip_dirs=skip_dirs):
+            for path in batch:
+                track(path)
+    _emit(out, type="watch", roots=roots, backend=type(watcher).__name__, stable_seconds=tracker.window,
+          apply=args.apply, mode=config_data.get('organize_mode', 'move'))
+    try:
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(wake.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+            wake.clear()
+            for path in watcher.read():
+                track(path)
+            if watcher.overflowed:
+                # 事件丢失：重新扫描，只补登记监控开始后修改过的文件
+                watcher.overflowed = False
+                _log(True, "[WARN] inotify 事件队列溢出，重新扫描监控目录")
+                for batch in scan_videos(roots, skip_dirs=skip_dirs):
+                    for path in batch:
+                        try:
+                            if os.path.getmtime(path) >= started:
+                                track(path)
+                        except OSError:
+                            continue
+            ready = tracker.poll()
+            if ready:
+                await refresh()
+            for start in range(0, len(ready), args.batch_size):
+                if stop.is_set():
+                    break
+                await _watch_batch(processor, renamer, ready[start:start + args.batch_size], config_data, out, args, handled)
+    finally:
+        if fd is not None:
+            loop.remove_reader(fd)
+        watcher.close()
+        await processor.aclose()
+    return 0
+
+def run_watch(args, load_config, out):
+    """load_config() 返回应用了命令行覆盖的整份配置，监控期间在批次之间重新调用以发现配置变更"""
+    from src.core.renamer import RenameEngine
+    from src.core.template import TemplateError
+    config_data = load_config()
+    roots = [os.path.abspath(p) for p in (args.paths or config_data.get('watch_dirs') or [])]
+    missing = [root for root in roots if not os.path.isdir(root)]
+    if not roots or missing:
+        _log(True, f"[ERROR] 监控目录不存在: {', '.join(missing)}" if missing else "[ERROR] 未指定监控目录 (参数或设置中的 watch_dirs)")
+        return 2
+    try:
+        renamer = RenameEngine.from_config(config_data)
+    except TemplateError as e:
+        _log(True, f"[ERROR] 重命名格式无效: {str(e)}")
+        return 2
+    return asyncio.run(_watch_loop(args, load_config, config_data, roots, renamer, out))
+
+def run_undo(args, out):
+    from src.core.renamer import RenameEngine
+    from src.core.executor import BatchExecutor
+    executor = BatchExecutor()
+    for journal, fixed in executor.recover():
+        _log(True, f"[WARN] 发现未正常结束的执行日志 {os.path.basename(journal.path)}，已按磁盘状态补记 {fixed} 个已完成操作")
+    journal = executor.last_undoable()
+    if journal is None:
+        _log(True, "[INFO] 没有可撤销的执行记录")
+        _emit(out, type="summary", undone=0, errors=0)
+        return 0
+    lock = threading.Lock()
+
+    def on_result(old_path, new_path, ok, msg):
+        with lock:
+            _emit(out, type="undo", source=old_path, target=new_path, ok=ok, message=msg)
+
+    if journal.mode == "move":
+        revert = lambda old, new: RenameEngine.execute_rename(old, new, make_dirs=False)
+    else:
+        revert = RenameEngine.remove_link
+    results = executor.undo(journal, revert, on_result)
+    errors = sum(1 for r in results if not r[2])
+    _emit(out, type="summary", journal=journal.path, undone=len(results) - errors, errors=errors)
+    return 1 if errors else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="VideoRenamer 命令行批处理 (输出 JSONL)")
+    parser.add_argument("paths", nargs="*", help="视频文件或文件夹 (文件夹按设置中的跳过目录递归扫描)")
+    parser.add_argument("--from-file", help="从文件读取路径列表，每行一个；- 表示标准输入")
+    parser.add_argument("--config", help="配置文件路径 (默认与图形界面相同的 VideoRenamer_Qt6.ini)")
+    parser.add_argument("--apply", action="store_true", help="执行重命名 (默认只输出计划)")
+    parser.add_argument("--undo", action="store_true", help="撤销最近一次执行")
+    parser.add_argument("--watch", action="store_true", help="常驻监控目录 (参数或设置中的 watch_dirs)，新文件写入完成后分批处理")
+    parser.add_argument("--scan-existing", action="store_true", help="监控开始时把目录中已有的文件也处理一遍")
+    parser.add_argument("--stable-seconds", type=float, help="文件大小与修改时间保持不变多少秒后视为写入完成")
+    parser.add_argument("--batch-size", type=int, default=20, help="监控模式每批处理的最大文件数")
+    parser.add_argument("--poll-interval", type=float, default=30.0, help="inotify 不可用时的轮询间隔 (秒)")
+    parser.add_argument("--mode", choices=["move", "hardlink", "symlink", "link"], help="整理方式，覆盖配置")
+    parser.add_argument("--no-cloud", action="store_true", help="只做本地识别")
+    parser.add_argument("--no-cache", action="store_true", help="不使用识别结果缓存")
+    parser.add_argument("--season", type=int, help="强制指定季号")
+    parser.add_argument("--episode-offset", type=int, help="集数偏移")
+    parser.add_argument("--tmdb-id", help="强制指定 TMDB ID")
+    parser.add_argument("--media-type", default="tv", choices=["tv", "movie"], help="与 --tmdb-id 配合的媒体类型")
+    parser.add_argument("--set", action="append", metavar="KEY=VALUE", help="覆盖任意配置项，可重复")
+    parser.add_argument("--logs", action="store_true", help="在计划记录中附带逐文件识别日志")
+    parser.add_argument("-v", "--verbose", action="store_true", help="在标准错误输出详细日志与阶段耗时")
+    args = parser.parse_args(argv)
+    if not (args.undo or args.watch) and not args.paths and not args.from_file:
+        parser.error("需要指定文件/文件夹或 --from-file")
+    args.batch_size = max(1, args.batch_size)
+
+    # 标准输出只留给 JSONL：依赖库的 print 一律改写到标准错误
+    out, sys.stdout = sys.stdout, sys.stderr
+    try:
+        if args.undo:
+            return run_undo(args, out)
+        from src.utils.ini_settings import IniSettings
+        from src.core.settings import config_from_store
+        load_config = lambda: _apply_overrides(config_from_store(IniSettings(args.config) if args.config else IniSettings()), args)
+        if args.watch:
+            return run_watch(args, load_config, out)
+        return run_batch(args, load_config(), out)
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        sys.stdout = out
+
+if __name__ == "__main__":
+    # L1 进程池以 spawn 启动子进程时会重新导入本模块，入口逻辑只在主进程执行
+    multiprocessing.freeze_support()
+    sys.exit(main())
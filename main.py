@@ -1,12 +1,16 @@
 import sys
-from PyQt6.QtWidgets import QApplication
-from src.gui.main_window import VideoRenamerGUI
+import multiprocessing
 
 def main():
+    # GUI 依赖放在函数内导入：L1 进程池以 spawn 启动子进程时会重新导入本模块，子进程无需加载 Qt
+    from PyQt6.QtWidgets import QApplication
+    from src.gui.main_window import VideoRenamerGUI
     app = QApplication(sys.argv)
     window = VideoRenamerGUI()
     window.show()
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    # 打包后的 EXE 中，L1 进程池的子进程需要经由此处分流
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,98 @@
+import inspect
+import importlib.util
+import httpx
+
+# 仅在安装了 h2 时启用 HTTP/2，否则 httpx 会在构造客户端时直接报错
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+class RedirectTransport(httpx.AsyncBaseTransport):
+    """
+    把所有请求改写到同一个基础地址，原主机名作为第一段路径保留：
+    https://api.themoviedb.org/3/search/tv?... -> {base_url}/api.themoviedb.org/3/search/tv?...
+    用于把 Provider 指向本地替身服务器 (benchmarks/standin_server.py)，无需改动算法库。
+    """
+    def __init__(self, base_url, **kwargs):
+        self.base = httpx.URL(base_url)
+        self._transport = httpx.AsyncHTTPTransport(**kwargs)
+
+    async def handle_async_request(self, request):
+        url = request.url
+        request.url = self.base.copy_with(path=self.base.path.rstrip("/") + "/" + url.host + url.path, query=url.query)
+        request.headers["Host"] = self.base.netloc.decode("ascii")
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+class HttpClientPool:
+    """
+    批次级的 HTTP 连接池。
+    每个 (服务, 代理) 组合共用一个 httpx.AsyncClient：长连接复用、可用时走 HTTP/2，
+    并限制单个服务的最大连接数，避免每个文件都重新握手 TLS / 代理 CONNECT。
+    设置 base_url 时所有服务都改走该地址 (忽略代理)，用于离线测试与基准。
+    """
+    def __init__(self, max_connections=8, timeout=15.0, base_url=None):
+        self.max_connections = max(1, int(max_connections))
+        self.timeout = timeout
+        self.base_url = base_url or None
+        self._clients = {}
+        self._providers = {}
+        self._replaced = []  # 被共享客户端替换下来的 Provider 自带客户端，随连接池一起关闭
+        self.unpooled = set()  # 找不到注入点、仍使用自带客户端的服务
+
+    def client(self, service, proxy=None) -> httpx.AsyncClient:
+        key = (service, proxy or "")
+        if key not in self._clients:
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=60.0
+            )
+            if self.base_url:
+                self._clients[key] = httpx.AsyncClient(
+                    transport=RedirectTransport(self.base_url, limits=limits), timeout=self.timeout)
+            else:
+                self._clients[key] = httpx.AsyncClient(
+                    proxy=proxy or None, http2=HTTP2_AVAILABLE, timeout=self.timeout, limits=limits)
+        return self._clients[key]
+
+    def provider(self, service, provider_cls, logs=None, **kwargs):
+        """
+        返回本批次复用的 Provider 实例，并尽量把共享客户端注入进去：
+        构造函数接受 client/http_client 参数时直接传入，否则替换实例上已有的 httpx 客户端属性。
+        找不到注入点时该服务记入 unpooled，并向 logs 写一条警告 (每个连接池每个服务一次)。
+        """
+        key = (service, provider_cls, tuple(sorted(kwargs.items())))
+        if key in self._providers:
+            return self._providers[key]
+        client = self.client(service, kwargs.get('proxy'))
+        try:
+            params = inspect.signature(provider_cls).parameters
+        except (TypeError, ValueError):
+            params = {}
+        hook = next((name for name in ("client", "http_client") if name in params), None)
+        if hook:
+            instance = provider_cls(**kwargs, **{hook: client})
+        else:
+            instance = provider_cls(**kwargs)
+            for attr in ("client", "_client", "http_client"):
+                original = getattr(instance, attr, None)
+                if isinstance(original, httpx.AsyncClient):
+                    if original is not client:
+                        self._replaced.append(original)
+                    setattr(instance, attr, client)
+                    break
+            else:
+                if service not in self.unpooled:
+                    self.unpooled.add(service)
+                    if logs is not None:
+                        where = f"云端替身地址 {self.base_url}" if self.base_url else "共享连接池"
+                        logs.append(f"[WARN] {provider_cls.__name__} 未提供可注入的 HTTP 客户端，{service} 请求不经过{where}")
+        self._providers[key] = instance
+        return instance
+
+    async def aclose(self):
+        clients, self._clients, self._providers = list(self._clients.values()) + self._replaced, {}, {}
+        self._replaced = []
+        for client in clients:
+            await client.aclose()
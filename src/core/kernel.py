@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+import hashlib
+import importlib
+import threading
+from src.utils.paths import CORE_ALGO_DIR
+
+class KernelRegistry:
+    """
+    进程级的内核组件注册表。
+    anime-matcher 内核在每个进程中只导入一次，之后直接返回缓存的组件句柄；
+    仅当内核包的源码签名发生变化 (例如 DownloadWorker 部署了新版本，或原地修改了 .py 文件) 时才重新导入。
+    """
+    PACKAGE = "anime_matcher"
+
+    def __init__(self, algo_dir=CORE_ALGO_DIR):
+        self.algo_dir = algo_dir
+        self.src_path = os.path.normpath(os.path.join(algo_dir, "src"))
+        self._lock = threading.Lock()
+        self._components = None
+        self._signature = None
+        self.version = ""
+        self.load_seconds = 0.0
+
+    def _compute_signature(self):
+        """内核签名：一次 os.walk 汇总内核包下所有 .py 文件的 (相对路径, 大小, mtime_ns)，原地修改源码也能发现"""
+        package_dir = os.path.join(self.src_path, self.PACKAGE)
+        if not os.path.isdir(package_dir):
+            return None
+        digest = hashlib.sha1()
+        for root, dirs, files in os.walk(package_dir):
+            dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+            for name in sorted(files):
+                if not name.endswith(".py"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                digest.update(f"{os.path.relpath(path, package_dir)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8", "surrogateescape"))
+        return digest.hexdigest()
+
+    def _purge_modules(self):
+        for name in list(sys.modules):
+            if name == self.PACKAGE or name.startswith(self.PACKAGE + "."):
+                del sys.modules[name]
+
+    def _import_components(self):
+        if self.src_path not in sys.path:
+            sys.path.insert(0, self.src_path)
+        importlib.invalidate_caches()
+        import regex
+        from anime_matcher.kernel import core_recognize
+        from anime_matcher.special_episode_handler import SpecialEpisodeHandler
+        from anime_matcher.providers.tmdb.client import TMDBProvider
+        from anime_matcher.providers.bangumi.client import BangumiProvider
+        from anime_matcher.storage_manager import storage
+        from anime_matcher.render_engine import RenderEngine
+        return {
+            "recognize": core_recognize, "sp_handler": SpecialEpisodeHandler,
+            "tmdb": TMDBProvider, "bgm": BangumiProvider,
+            "storage": storage, "render_engine": RenderEngine
+        }
+
+    def get(self, logs):
+        """返回缓存的内核组件；内核缺失或加载失败时返回 None"""
+        signature = self._compute_signature()
+        if signature is None:
+            return None
+        with self._lock:
+            if self._components is not None and signature == self._signature:
+                return self._components
+            if self._components is not None:
+                logs.append("┣ 🔄 检测到内核源码变更，重新加载算法内核...")
+                self._purge_modules()
+                self._components = None
+            start = time.perf_counter()
+            try:
+                components = self._import_components()
+            except Exception as e:
+                self._purge_modules()
+                logs.append(f"┣ ❌ 核心库加载失败: {str(e)}")
+                return None
+            self.load_seconds = time.perf_counter() - start
+            self._components, self._signature = components, signature
+            self.version = signature[:12]
+            logs.append(f"┣ ⏱️ 内核冷启动完成: {self.load_seconds:.2f}s (版本指纹 {self.version})")
+            return components
+
+    def invalidate(self):
+        """强制下次 get() 时重新导入 (用于内核更新后)"""
+        with self._lock:
+            self._signature = None
+
+# Global instance
+kernel_registry = KernelRegistry()
@@ -0,0 +1,64 @@
+import time
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# 子进程内的常驻状态：每个进程只加载一次内核与规则
+_worker_state = {}
+
+def _init_worker(config_data, rules):
+    from src.core.processor import RecognitionProcessor
+    processor = RecognitionProcessor(config_data)
+    logs = []
+    components = processor._get_core_components(logs)
+    if components and rules.get('privileged'):
+        components["sp_handler"].load_external_rules(rules['privileged'])
+    _worker_state.update(processor=processor, components=components, rules=rules, init_logs=logs)
+
+def _recognize_chunk(file_paths):
+    processor = _worker_state["processor"]
+    components = _worker_state["components"]
+    rules = _worker_state["rules"]
+    results = []
+    for path in file_paths:
+        if not components:
+            results.append((None, None, _worker_state["init_logs"] + ["┗ ❌ L1 子进程内核加载失败"]))
+            continue
+        logs = []
+        try:
+            start = time.perf_counter()
+            final_dict, l1_info = processor._local_stage(components, path, rules, logs)
+            l1_info["seconds"] = time.perf_counter() - start
+            l1_info["spans"] = processor.tracer.pop_all()  # 随结果带回父进程汇总
+            results.append((final_dict, l1_info, logs))
+        except Exception as e:
+            processor.tracer.pop_all()
+            results.append((None, None, logs + [f"[CRITICAL] L1 子进程识别失败: {str(e)}"]))
+    return results
+
+class LocalRecognitionPool:
+    """
+    L1 本地识别进程池。
+    core_recognize 与特权规则处理都是纯 CPU 的正则运算，放到多进程中绕开 GIL；
+    云端对撞仍留在父进程的事件循环里。
+    """
+    def __init__(self, processes, config_data, rules, chunk_size=32):
+        self.chunk_size = max(1, chunk_size)
+        # 统一使用 spawn：避免 fork 带着 Qt 线程状态进入子进程
+        self.executor = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(config_data, rules)
+        )
+
+    def schedule(self, file_paths):
+        """按 chunk 一次性提交整批文件，返回按顺序排列的 (起始下标, future)"""
+        loop = asyncio.get_running_loop()
+        return [
+            (start, loop.run_in_executor(self.executor, _recognize_chunk, list(file_paths[start:start + self.chunk_size])))
+            for start in range(0, len(file_paths), self.chunk_size)
+        ]
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
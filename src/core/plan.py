@@ -0,0 +1,116 @@
+import os
+import json
+import hashlib
+
+def file_fingerprint(path):
+    """源文件的 stat 指纹 (大小, mtime_ns)；文件不存在时返回 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+def config_key(config_data):
+    """整份任务配置的指纹：格式、覆盖参数或联网设置任一变化都会让旧计划失效"""
+    return hashlib.sha1(json.dumps(config_data, sort_keys=True, ensure_ascii=False, default=str).encode()).hexdigest()
+
+# 计划条目状态：只有 ready 会真正执行
+STATUS_READY = "ready"
+STATUS_NOOP = "noop"
+STATUS_CONFLICT = "conflict"
+STATUS_FAILED = "failed"
+STATUS_LABELS = {STATUS_READY: "就绪", STATUS_NOOP: "无需重命名", STATUS_CONFLICT: "冲突", STATUS_FAILED: "识别失败"}
+
+def _path_key(path):
+    return os.path.normcase(os.path.normpath(path))
+
+class RenamePlanItem:
+    """一条重命名计划：源/目标路径、目标文件夹、生成计划时源文件的 stat 指纹，以及规划状态"""
+    __slots__ = ('source', 'target', 'main_folder', 'season_folder', 'fingerprint', 'status', 'message')
+
+    def __init__(self, source, target, main_folder, season_folder, fingerprint=None):
+        self.source = source
+        self.target = target
+        self.main_folder = main_folder
+        self.season_folder = season_folder
+        self.fingerprint = fingerprint if fingerprint is not None else file_fingerprint(source)
+        self.status = STATUS_READY
+        self.message = ""
+
+    @property
+    def label(self):
+        text = STATUS_LABELS.get(self.status, self.status)
+        return f"{text}: {self.message}" if self.message else text
+
+    def is_stale(self):
+        """源文件在预览之后被修改、移动或删除"""
+        return not self.fingerprint or file_fingerprint(self.source) != self.fingerprint
+
+class RenamePlan:
+    """
+    预览阶段产出的重命名计划。
+    执行阶段只需确认源文件未变化即可直接套用，无需再次识别与联网。
+    添加条目时即在内存中完成目标路径去重：同批次内先到者占用目标，后到者标记为冲突；
+    磁盘上已存在的目标与源文件指纹都取自按目录整体列举一次的 DirEntry，不对单个路径逐个 stat
+    (Windows 上 DirEntry.stat() 直接使用列举结果，无额外系统调用)。
+    """
+    def __init__(self, config_data=None):
+        self.config_key = config_key(config_data) if config_data is not None else None
+        self.items = []
+        self._claimed = {}
+        self._dir_entries = {}
+
+    def _entry(self, path):
+        """path 所在目录列举结果中的 DirEntry，不存在时返回 None"""
+        directory = os.path.dirname(path)
+        entries = self._dir_entries.get(directory)
+        if entries is None:
+            try:
+                with os.scandir(directory) as it:
+                    entries = {os.path.normcase(entry.name): entry for entry in it}
+            except OSError:
+                entries = {}
+            self._dir_entries[directory] = entries
+        return entries.get(os.path.normcase(os.path.basename(path)))
+
+    def _exists_on_disk(self, target):
+        return self._entry(target) is not None
+
+    def _fingerprint(self, source):
+        entry = self._entry(source)
+        if entry is None:
+            return None
+        try:
+            st = entry.stat()
+        except OSError:
+            return None
+        return (st.st_size, st.st_mtime_ns)
+
+    def add(self, source, target, main_folder, season_folder, recognized=True):
+        # () 表示生成计划时源文件不存在，避免构造函数再次 stat
+        item = RenamePlanItem(source, target, main_folder, season_folder, self._fingerprint(source) or ())
+        key = _path_key(target)
+        if not recognized:
+            item.status, item.message = STATUS_FAILED, "未获得完整识别结果，跳过"
+        elif key == _path_key(source):
+            item.status = STATUS_NOOP
+        elif key in self._claimed:
+            item.status = STATUS_CONFLICT
+            item.message = f"与 {os.path.basename(self._claimed[key].source)} 的目标重复"
+        elif self._exists_on_disk(target):
+            item.status, item.message = STATUS_CONFLICT, "目标已存在"
+        else:
+            self._claimed[key] = item
+        self.items.append(item)
+        return item
+
+    def conflicts(self):
+        return [item for item in self.items if item.status == STATUS_CONFLICT]
+
+    def matches(self, file_paths, config_data):
+        """计划是否仍对应当前的文件列表与配置"""
+        return (self.config_key == config_key(config_data)
+                and [item.source for item in self.items] == list(file_paths))
+
+    def __len__(self):
+        return len(self.items)
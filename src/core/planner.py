@@ -0,0 +1,192 @@
+import time
+import asyncio
+import traceback
+from src.core.processor import RecognitionResult
+
+async def iter_ordered(items, func, concurrency, should_stop=None):
+    """
+    以最多 concurrency 个并发执行 await func(item)，结果严格按输入顺序逐个产出 (item, 结果)。
+    should_stop() 为真时不再启动新任务，已产出的部分保持有序。
+    """
+    loop = asyncio.get_running_loop()
+    slots = [loop.create_future() for _ in items]
+    feeder = iter(enumerate(items))
+
+    async def _worker():
+        try:
+            for i, item in feeder:
+                if should_stop and should_stop():
+                    return
+                slots[i].set_result(await func(item))
+        finally:
+            alive[0] -= 1
+            if not alive[0]:
+                # 所有 worker 都已退出后，再用 None 唤醒未被领取的槽位，让消费端尽快退出
+                for slot in slots:
+                    if not slot.done(): slot.set_result(None)
+
+    alive = [min(max(1, concurrency), len(slots))]
+    workers = [asyncio.ensure_future(_worker()) for _ in range(alive[0])]
+    try:
+        for i, item in enumerate(items):
+            result = await slots[i]
+            if result is None: break
+            yield item, result
+    finally:
+        for w in workers: w.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+class RecognitionGroup:
+    """同一系列 (标题 / 年份 / 媒体类型，或同一 TMDB ID) 的文件分组，整组只做一次云端解析"""
+    def __init__(self, key, leader):
+        self.key = key
+        self.leader = leader
+        self.members = []
+        self.lookup = None
+        self.failed = False
+        self.logs = []
+        self.seconds = 0.0
+
+    def to_dict(self, index_map=None):
+        """index_map: 成员下标到整批输入下标的映射 (启用结果缓存时，分组只覆盖未命中的文件)"""
+        cloud_data, resolved_id, _ = self.lookup or (None, None, False)
+        cloud_data = cloud_data or {}
+        return {
+            "key": self.key,
+            "members": [index_map[i] for i in self.members] if index_map else list(self.members),
+            "title": cloud_data.get("title") or cloud_data.get("name") or "",
+            "tmdb_id": str(cloud_data.get("id") or resolved_id or ""),
+            "matched": bool(cloud_data),
+            "count": len(self.members),
+            "seconds": round(self.seconds, 3)
+        }
+
+class BatchPlanner:
+    """
+    位于 RecognitionProcessor 之前的批次规划器。
+    先对整批文件执行 L1，再按系列分组；每组只做一次 TMDB/Bangumi 解析与详情获取，
+    最后把云端字段复制进各成员的 final_dict 并逐文件完成渲染。
+    """
+    def __init__(self, processor):
+        self.processor = processor
+        self.groups = []
+
+    def _group(self, locals_):
+        groups = {}
+        for i, (final_dict, l1_info, _) in enumerate(locals_):
+            if final_dict is None: continue
+            key = self.processor.flight_key(final_dict, l1_info)
+            if key not in groups:
+                groups[key] = RecognitionGroup(key, i)
+            groups[key].members.append(i)
+        return list(groups.values())
+
+    async def _resolve_group(self, group, locals_):
+        final_dict, l1_info, _ = locals_[group.leader]
+        start = time.perf_counter()
+        try:
+            # 在代表文件的副本上解析，避免提前改写其 final_dict
+            group.lookup = await self.processor.cloud_lookup(dict(final_dict), l1_info, group.logs)
+        except Exception as e:
+            group.logs.append(f"[CRITICAL] 分组云端解析失败: {str(e)}\n{traceback.format_exc()}")
+            group.lookup = (None, None, False)
+            group.failed = True
+        group.seconds = time.perf_counter() - start
+        return group
+
+    async def iter_recognize(self, file_paths, concurrency=None, should_stop=None, on_local_progress=None, cache=None,
+                             on_groups=None):
+        """
+        按输入顺序逐个产出 (路径, RecognitionResult)；self.groups 在云端阶段结束后可用。
+        传入 cache (ResultCache) 时，文件与上下文均未变化的结果直接复用，只有未命中的文件进入识别流程，
+        此时 self.groups 的成员下标指向未命中的子集。
+        on_groups(分组字典列表) 在云端阶段结束后调用一次，其中 members 已换算为 file_paths 的下标。
+        """
+        report = (lambda groups: on_groups([g.to_dict() for g in groups])) if on_groups else None
+        if cache is None or not file_paths or not self.processor._get_core_components([]):
+            async for item in self._iter_pipeline(file_paths, concurrency, should_stop, on_local_progress, report):
+                yield item
+            return
+
+        context = self.processor.cache_context()
+        cached = {}
+        with self.processor.tracer.span("cache.lookup", count=len(file_paths)):
+            keys = [cache.file_key(path, context) for path in file_paths]
+            for i, key in enumerate(keys):
+                hit = cache.get(key)
+                if hit:
+                    data, logs = hit
+                    cached[i] = RecognitionResult(data, ["♻️ 命中识别结果缓存，跳过识别流程"] + logs)
+        miss_index = [i for i in range(len(file_paths)) if i not in cached]
+        misses = [file_paths[i] for i in miss_index]
+        if on_groups:
+            report = lambda groups: on_groups([g.to_dict(miss_index) for g in groups])
+
+        pipeline = self._iter_pipeline(misses, concurrency, should_stop, on_local_progress, report)
+        try:
+            for i, path in enumerate(file_paths):
+                if i in cached:
+                    yield path, cached[i]
+                    continue
+                item = await pipeline.__anext__()
+                _, result = item
+                if "path" in result.to_dict() and result.cacheable:  # 只缓存完整结果，识别失败、内核缺失或云端未命中不入库
+                    cache.put(keys[i], path, result.to_dict(), result.logs)
+                yield item
+        except StopAsyncIteration:
+            pass
+        finally:
+            await pipeline.aclose()
+            cache.flush()
+
+    async def _iter_pipeline(self, file_paths, concurrency=None, should_stop=None, on_local_progress=None, on_groups=None):
+        processor = self.processor
+        limit = max(1, int(concurrency or processor.config.get('max_concurrency', 8)))
+        boot_logs = []
+        if not processor._get_core_components(boot_logs):
+            for path in file_paths:
+                yield path, RecognitionResult({"title": "内核未就绪"}, boot_logs + ["┗ ❌ 内核缺失，请在设置中下载算法。"])
+            return
+
+        # 1. 整批 L1
+        header = processor.begin_logs()
+        locals_ = await processor.local_recognize_batch(file_paths, should_stop, on_local_progress)
+        if should_stop and should_stop(): return
+
+        # 2. 分组 + 每组一次云端解析
+        self.groups = self._group(locals_)
+        group_of = {i: g for g in self.groups for i in g.members}
+        if processor.cloud_enabled():
+            async for _ in iter_ordered(self.groups, lambda g: self._resolve_group(g, locals_), limit, should_stop):
+                pass
+            if should_stop and should_stop(): return
+        if on_groups: on_groups(self.groups)
+
+        # 3. 逐文件合并云端字段并渲染
+        async def _finish(i):
+            final_dict, l1_info, l1_logs = locals_[i]
+            logs = header + l1_logs
+            if final_dict is None:
+                return RecognitionResult({"title": "识别失败"}, logs)
+            try:
+                group = group_of[i]
+                elapsed = l1_info.get("seconds", 0.0)
+                if processor.cloud_enabled():
+                    logs.append("┃")
+                    logs.append(f"┃ [联动] 系列分组 {group.key} 共 {len(group.members)} 个文件，共享一次云端解析")
+                    if i == group.leader:
+                        logs.extend(group.logs)
+                        elapsed += group.seconds
+                    processor.apply_cloud(final_dict, group.lookup, logs)
+                result = await processor.finalize(final_dict, l1_info, logs, elapsed)
+                if processor.cloud_enabled() and (group.failed or not group.lookup[0]):
+                    # 网络异常、429、超时与真正的 "无匹配" 无法区分，一律不缓存，下次重新请求
+                    result.cacheable = False
+                return result
+            except Exception as e:
+                logs.append(f"[CRITICAL] 识别流程崩溃: {str(e)}\n{traceback.format_exc()}")
+                return RecognitionResult({"title": "识别失败"}, logs)
+
+        indices = list(range(len(locals_)))
+        async for i, result in iter_ordered(indices, _finish, limit, should_stop):
+            yield file_paths[i], result
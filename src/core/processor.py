@@ -1,16 +1,17 @@
 import os
-import sys
 import time
 import traceback
 import asyncio
-import importlib
 import json
-from src.utils.paths import CORE_ALGO_DIR, APP_ROOT
+from src.core.kernel import kernel_registry
+from src.core.singleflight import SingleFlight
+from src.utils.tracing import Tracer
 
 class RecognitionResult:
     def __init__(self, data: dict, logs: list):
         self.logs = logs
         self._data = data
+        self.cacheable = True  # 云端阶段失败或未命中时置为 False，不写入持久结果缓存
         for k, v in data.items(): setattr(self, k, v)
     def to_dict(self): return self._data
 
@@ -19,159 +20,338 @@ class RecognitionProcessor:
         self.config = config_data or {}
         self.custom_words = self.config.get('custom_words', [])
         self.custom_groups = self.config.get('custom_groups', [])
+        self._local_pool = None
+        self._components = None
+        self._rules = None
+        self._privileged_loaded = False
+        self._http_pool = None
+        self._single_flight = SingleFlight()
+        self.tracer = Tracer()
 
     def _get_core_components(self, logs):
-        core_src_path = os.path.normpath(os.path.join(CORE_ALGO_DIR, "src"))
-        if not os.path.exists(core_src_path):
-            return None
-        if core_src_path not in sys.path:
-            sys.path.insert(0, core_src_path)
-            importlib.invalidate_caches()
-        try:
-            import regex
-            from anime_matcher.kernel import core_recognize
-            from anime_matcher.special_episode_handler import SpecialEpisodeHandler
-            from anime_matcher.providers.tmdb.client import TMDBProvider
-            from anime_matcher.providers.bangumi.client import BangumiProvider
-            from anime_matcher.storage_manager import storage
-            from anime_matcher.render_engine import RenderEngine
-            return {
-                "recognize": core_recognize, "sp_handler": SpecialEpisodeHandler,
-                "tmdb": TMDBProvider, "bgm": BangumiProvider,
-                "storage": storage, "render_engine": RenderEngine
-            }
-        except Exception as e:
-            logs.append(f"┣ ❌ 核心库加载失败: {str(e)}")
-            return None
+        # 同一个处理器 (即同一批次) 内只向注册表取一次，避免逐文件检查内核目录
+        if self._components is None:
+            with self.tracer.span("kernel.load"):
+                self._components = kernel_registry.get(logs)
+        return self._components
+
+    def prepare(self):
+        """批次开始前预热内核并构建 TMDB Provider，返回加载日志 (含连接池无法注入的警告)"""
+        logs = []
+        components = self._get_core_components(logs)
+        if components and not logs:
+            logs.append(f"┣ ♻️ 复用已加载内核 (版本指纹 {kernel_registry.version}，冷启动耗时 {kernel_registry.load_seconds:.2f}s)")
+        if components:
+            self._tmdb_provider(components, logs)
+        return logs
 
     def recognize_file(self, filename_path: str) -> RecognitionResult:
         try:
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
             result = loop.run_until_complete(self._async_recognize(filename_path))
+            loop.run_until_complete(self.aclose())
             loop.close()
             return result
         except Exception as e:
             return RecognitionResult({"title": "异常"}, [f"[CRITICAL] {str(e)}"])
 
-    async def _async_recognize(self, filename_path: str) -> RecognitionResult:
-        start_time = time.time()
-        logs = []
-        original_filename = os.path.basename(filename_path)
+    def _get_local_pool(self):
+        """按配置懒加载 L1 进程池 (l1_processes 为 0 时关闭)"""
+        processes = int(self.config.get('l1_processes', 0) or 0)
+        if processes <= 0: return None
+        if self._local_pool is None:
+            from src.core.local_pool import LocalRecognitionPool
+            rules = self._get_rules()
+            self._local_pool = LocalRecognitionPool(processes, self.config, rules)
+        return self._local_pool
 
-        logs.append(f"🚀 --- [ANIME 深度审计流启动] ---")
-        
-        def on_off(b): return "ON" if b else "OFF"
-        logs.append(f"┃ [配置] 云端联动[{on_off(self.config.get('with_cloud'))}] | 智能记忆[{on_off(self.config.get('use_storage'))}] | 动漫优先[{on_off(self.config.get('anime_priority'))}]")
+    def _get_http_pool(self):
+        # 连接池绑定在当前事件循环上，由批次 (即本处理器) 持有，批次结束时 aclose()
+        if self._http_pool is None:
+            from src.core.http_pool import HttpClientPool
+            self._http_pool = HttpClientPool(max_connections=self.config.get('max_concurrency', 8), base_url=self.config.get('cloud_base_url'))
+        return self._http_pool
 
-        components = self._get_core_components(logs)
-        if not components:
-            return RecognitionResult({"title": "内核未就绪"}, logs + ["┗ ❌ 内核缺失，请在设置中下载算法。"])
+    def close(self):
+        if self._local_pool:
+            self._local_pool.close()
+            self._local_pool = None
 
-        try:
+    def reset_flights(self):
+        """常驻进程在批次之间调用：清空云端请求合并表，结果不跨批次复用，合并表也不会无限增长"""
+        self._single_flight = SingleFlight()
+
+    async def aclose(self):
+        """释放批次资源：HTTP 连接池与 L1 进程池"""
+        if self._http_pool:
+            await self._http_pool.aclose()
+            self._http_pool = None
+        self.reset_flights()
+        self.close()
+
+    def _get_rules(self):
+        """
+        本批次使用的规则：只取一次 RuleManager 快照，
+        并预先把自定义识别词/制作组与数据库规则合并去重，避免逐文件重建列表。
+        """
+        if self._rules is None:
             from src.core.rules import RuleManager
-            db_noise = RuleManager.get_merged_rules('noise')
-            db_group = RuleManager.get_merged_rules('group')
-            db_privileged = RuleManager.get_merged_rules('privileged')
-            db_render = RuleManager.get_merged_rules('render')
-            
-            logs.append("┃ [审计] 正在载入 SQLite 持久化规则...")
-            logs.append(f"┣ 🏷️ Noise (识别词): {len(db_noise)} 条")
-            logs.append(f"┣ 🏷️ Group (制作组): {len(db_group)} 条")
-            logs.append(f"┣ 🏷️ Privileged (特权): {len(db_privileged)} 条")
-            logs.append(f"┣ 🏷️ Render (渲染词): {len(db_render)} 条")
+            with self.tracer.span("rules.load"):
+                snapshot = RuleManager.get_snapshot()
+            self._rules = {
+                "version": snapshot.version, "digest": snapshot.digest,
+                "noise": list(snapshot.noise), "group": list(snapshot.group),
+                "privileged": list(snapshot.privileged), "render": list(snapshot.render),
+                "custom_words": sorted(set(self.custom_words).union(snapshot.noise)),
+                "custom_groups": sorted(set(self.custom_groups).union(snapshot.group))
+            }
+        return self._rules
 
-            if db_privileged:
-                components["sp_handler"].load_external_rules(db_privileged)
+    def cache_context(self):
+        """结果缓存的批次上下文指纹 (需在内核加载之后调用)"""
+        from src.utils.result_cache import context_key
+        return context_key(self.config, self._get_rules()['digest'], kernel_registry.version)
 
-            logs.append("┃")
+    def _log_rules(self, rules, logs):
+        logs.append(f"┃ [审计] 载入规则快照 v{rules['version']} ({rules['digest'][:8]})")
+        logs.append(f"┣ 🏷️ Noise (识别词): {len(rules['noise'])} 条")
+        logs.append(f"┣ 🏷️ Group (制作组): {len(rules['group'])} 条")
+        logs.append(f"┣ 🏷️ Privileged (特权): {len(rules['privileged'])} 条")
+        logs.append(f"┣ 🏷️ Render (渲染词): {len(rules['render'])} 条")
+
+    def _local_stage(self, components, filename_path, rules, logs):
+        """
+        L1 本地识别 (纯 CPU)。
+        返回值只包含基础类型，可以直接从进程池子进程中传回：(final_dict, l1_info)
+        """
+        original_filename = os.path.basename(filename_path)
+        with self.tracer.span("l1.core_recognize", filename_path):
             meta = components["recognize"](
                 input_name=original_filename,
-                custom_words=list(set(self.custom_words + db_noise)),
-                custom_groups=list(set(self.custom_groups + db_group)),
+                custom_words=rules['custom_words'],
+                custom_groups=rules['custom_groups'],
                 original_input=original_filename,
                 current_logs=logs,
                 batch_enhancement=self.config.get('batch_enhancement', False),
                 force_filename=True
             )
 
-            custom_settings = self.config.get('custom_settings', {})
-            ui_tmdb_id = custom_settings.get('tmdb_id_override')
-            ui_media_type = custom_settings.get('media_type_override', 'tv')
+        custom_settings = self.config.get('custom_settings', {})
+        ui_tmdb_id = custom_settings.get('tmdb_id_override')
+        ui_media_type = custom_settings.get('media_type_override', 'tv')
+        
+        final_tmdb_id = ui_tmdb_id if ui_tmdb_id else (str(meta.forced_tmdbid) if meta.forced_tmdbid else "")
+        m_type_zh = "电影" if (ui_media_type == "movie" or "movie" in str(meta.type).lower()) else "剧集"
+
+        final_dict = {
+            "title": meta.cn_name or meta.en_name or meta.processed_name or original_filename,
+            "tmdb_id": final_tmdb_id, "category": m_type_zh, "processed_name": meta.processed_name or "",
+            "poster_path": "", "release_date": "",
+            "season": meta.begin_season if meta.begin_season is not None else 1,
+            "episode": str(meta.begin_episode) if meta.begin_episode is not None else "1",
+            "team": meta.resource_team or "", "resolution": meta.resource_pix or "",
+            "video_encode": meta.video_encode or "", "video_effect": meta.video_effect or "",
+            "audio_encode": meta.audio_encode or "", "subtitle": meta.subtitle_lang or "",
+            "source": meta.resource_type or "", "platform": meta.resource_platform or "",
+            "origin_country": "日本", "vote_average": 0.0, "year": meta.year or "",
+            "duration": "", "filename": original_filename, "path": filename_path
+        }
+        l1_info = {"cn_name": meta.cn_name, "en_name": meta.en_name, "year": meta.year,
+                   "season": meta.begin_season, "episode": meta.begin_episode}
+        return final_dict, l1_info
+
+    def begin_logs(self):
+        """每个文件审计日志的开头：配置概要与本批次规则快照"""
+        logs = [f"🚀 --- [ANIME 深度审计流启动] ---"]
+        def on_off(b): return "ON" if b else "OFF"
+        logs.append(f"┃ [配置] 云端联动[{on_off(self.config.get('with_cloud'))}] | 智能记忆[{on_off(self.config.get('use_storage'))}] | 动漫优先[{on_off(self.config.get('anime_priority'))}]")
+        self._log_rules(self._get_rules(), logs)
+        logs.append("┃")
+        return logs
+
+    def local_recognize(self, filename_path):
+        """在本进程内执行 L1，返回 (final_dict, l1_info, logs)；失败时 final_dict 为 None"""
+        logs = []
+        components = self._get_core_components(logs)
+        if not components:
+            return None, None, logs + ["┗ ❌ 内核缺失，请在设置中下载算法。"]
+        try:
+            rules = self._get_rules()
+            if rules['privileged'] and not self._privileged_loaded:
+                with self.tracer.span("rules.privileged_load"):
+                    components["sp_handler"].load_external_rules(rules['privileged'])
+                self._privileged_loaded = True
+            start = time.perf_counter()
+            final_dict, l1_info = self._local_stage(components, filename_path, rules, logs)
+            l1_info["seconds"] = time.perf_counter() - start
+            return final_dict, l1_info, logs
+        except Exception as e:
+            logs.append(f"[CRITICAL] 识别流程崩溃: {str(e)}\n{traceback.format_exc()}")
+            return None, None, logs
+
+    async def local_recognize_batch(self, file_paths, should_stop=None, on_progress=None):
+        """
+        对整批文件执行 L1，按输入顺序返回 (final_dict, l1_info, logs) 列表。
+        开启 l1_processes 时分块交给进程池并行计算，否则在当前线程内逐个识别。
+        """
+        total = len(file_paths)
+        results = []
+        pool = self._get_local_pool() if file_paths else None
+        if pool:
+            for start, future in pool.schedule(file_paths):
+                if should_stop and should_stop(): break
+                try:
+                    chunk = await future
+                    for _, l1_info, _ in chunk:
+                        if l1_info: self.tracer.extend(l1_info.pop("spans", []))
+                    results.extend(chunk)
+                except Exception as e:
+                    size = min(pool.chunk_size, total - start)
+                    results.extend((None, None, [f"[CRITICAL] L1 进程池异常: {str(e)}"]) for _ in range(size))
+                if on_progress: on_progress(len(results), total)
+            return results
+
+        for path in file_paths:
+            if should_stop and should_stop(): break
+            results.append(self.local_recognize(path))
+            if len(results) % 16 == 0 or len(results) == total:
+                if on_progress: on_progress(len(results), total)
+                await asyncio.sleep(0)  # 让出事件循环，便于响应中断
+        return results
+
+    def cloud_enabled(self):
+        return bool(self.config.get('with_cloud') and self.config.get('tmdb_api_key'))
+
+    def _tmdb_provider(self, components, logs=None):
+        if not self.cloud_enabled(): return None
+        return self._get_http_pool().provider("tmdb", components["tmdb"], logs, api_key=self.config['tmdb_api_key'], proxy=self.config.get('tmdb_proxy'))
+
+    @staticmethod
+    def flight_key(final_dict, l1_info):
+        """
+        云端解析的合并键：已知 TMDB ID 时按 ID，否则为 "{name}|{year}|{媒体类型}"。
+        与智能记忆的 "{name}|{year}" 指纹不同，多出的媒体类型使同名同年的电影与剧集不会合并为一次请求。
+        """
+        m_type_en = "movie" if final_dict["category"] == "电影" else "tv"
+        if final_dict["tmdb_id"]:
+            return f"id:{final_dict['tmdb_id']}|{m_type_en}"
+        return f"{l1_info['cn_name'] or l1_info['en_name']}|{l1_info['year']}|{m_type_en}"
+
+    async def _resolve_cloud(self, components, tmdb_client, tmdb_id, cn_name, en_name, year, m_type_en, season, logs, source=None):
+        """
+        一次完整的云端解析：记忆命中或指定 ID 时直接取详情，否则 TMDB 检索 + Bangumi 故障转移。
+        返回 (云端数据, 采信的 TMDB ID)。source 为计时归属的文件。
+        """
+        span = self.tracer.span
+        fingerprint = f"{cn_name or en_name}|{year}"
+        if not tmdb_id and self.config.get('use_storage'):
+            with span("cloud.memory_lookup", source):
+                memory = components["storage"].get_memory(fingerprint)
+            if memory: 
+                tmdb_id = memory['tmdb_id']
+                logs.append(f"┃ [记忆] ⚡ 命中心特征指纹，自动锁定 ID: {tmdb_id}")
+        
+        if tmdb_id:
+            with span("cloud.tmdb_details", source):
+                cloud_data = await tmdb_client.get_details(tmdb_id, m_type_en, logs)
+        else:
+            with span("cloud.tmdb_search", source):
+                cloud_data = await tmdb_client.smart_search(cn_name, en_name, year, m_type_en, logs, anime_priority=self.config.get('anime_priority', True))
             
-            final_tmdb_id = ui_tmdb_id if ui_tmdb_id else (str(meta.forced_tmdbid) if meta.forced_tmdbid else "")
-            m_type_zh = "电影" if (ui_media_type == "movie" or "movie" in str(meta.type).lower()) else "剧集"
-            m_type_en = "movie" if m_type_zh == "电影" else "tv"
-
-            final_dict = {
-                "title": meta.cn_name or meta.en_name or meta.processed_name or original_filename,
-                "tmdb_id": final_tmdb_id, "category": m_type_zh, "processed_name": meta.processed_name or "",
-                "poster_path": "", "release_date": "",
-                "season": meta.begin_season if meta.begin_season is not None else 1,
-                "episode": str(meta.begin_episode) if meta.begin_episode is not None else "1",
-                "team": meta.resource_team or "", "resolution": meta.resource_pix or "",
-                "video_encode": meta.video_encode or "", "video_effect": meta.video_effect or "",
-                "audio_encode": meta.audio_encode or "", "subtitle": meta.subtitle_lang or "",
-                "source": meta.resource_type or "", "platform": meta.resource_platform or "",
-                "origin_country": "日本", "vote_average": 0.0, "year": meta.year or "",
-                "duration": "", "filename": original_filename, "path": filename_path
-            }
+            if not cloud_data and self.config.get('bgm_failover'):
+                logs.append("┃ [救灾] TMDB 检索无结果，触发 Bangumi 故障转移...")
+                with span("cloud.bangumi_failover", source):
+                    bgm = self._get_http_pool().provider("bangumi", components["bgm"], logs, token=self.config.get('bangumi_token'), proxy=self.config.get('bangumi_proxy'))
+                    bgm_subject = await bgm.search_subject(cn_name or en_name, logs)
+                    if bgm_subject:
+                        cloud_data = await bgm.map_to_tmdb(bgm_subject, tmdb_api_key=self.config['tmdb_api_key'], logs=logs, tmdb_proxy=self.config.get('tmdb_proxy'))
+
+        if cloud_data and self.config.get('use_storage'):
+            with span("cloud.memory_store", source):
+                components["storage"].set_memory(fingerprint, str(cloud_data.get('id')), m_type_en, season)
+        return cloud_data, tmdb_id
+
+    async def cloud_lookup(self, final_dict, l1_info, logs):
+        """
+        执行 (或复用) 一次云端解析，返回 (云端数据, 采信的 TMDB ID, 是否复用)。
+        同一 flight_key 的并发调用只会真正请求一次；未命中的结果不在批次内保留，后续调用会重新请求。
+        """
+        components = self._get_core_components(logs)
+        tmdb_client = self._tmdb_provider(components)
+        m_type_en = "movie" if final_dict["category"] == "电影" else "tv"
+        key = self.flight_key(final_dict, l1_info)
+        (cloud_data, resolved_id), shared = await self._single_flight.do(
+            key,
+            lambda: self._resolve_cloud(components, tmdb_client, final_dict["tmdb_id"], l1_info["cn_name"], l1_info["en_name"], l1_info["year"], m_type_en, final_dict["season"], logs, final_dict.get("path")),
+            keep=lambda lookup: bool(lookup[0])
+        )
+        if shared:
+            logs.append(f"┃ [合并] ⚡ 复用同批次内的云端请求结果: {key}")
+        return cloud_data, resolved_id, shared
+
+    @staticmethod
+    def apply_cloud(final_dict, lookup, logs):
+        """把云端解析结果写入 final_dict"""
+        cloud_data, resolved_id, _ = lookup
+        if resolved_id and not final_dict["tmdb_id"]:
+            final_dict["tmdb_id"] = resolved_id
+        if cloud_data:
+            logs.append(f"┗ ✅ 云端对撞成功: {cloud_data.get('title') or cloud_data.get('name')} (ID: {cloud_data.get('id')})")
+            final_dict.update({
+                "title": cloud_data.get("title") or cloud_data.get("name") or final_dict["title"],
+                "tmdb_id": str(cloud_data.get("id", "")),
+                "poster_path": cloud_data.get("poster_path", ""),
+                "release_date": cloud_data.get("release_date") or cloud_data.get("first_air_date") or "",
+                "vote_average": float(cloud_data.get("vote_average", 0.0)),
+                "origin_country": ", ".join(cloud_data.get("origin_country", [])) if isinstance(cloud_data.get("origin_country"), list) else ""
+            })
+            if not final_dict["year"] and final_dict["release_date"]: final_dict["year"] = final_dict["release_date"][:4]
+        else:
+            logs.append("┗ ❌ 云端对撞未发现高置信度匹配")
+
+    async def finalize(self, final_dict, l1_info, logs, elapsed=0.0) -> RecognitionResult:
+        """L3 专家渲染并生成最终结果；elapsed 为此前各阶段已花费的秒数"""
+        start_time = time.time() - elapsed
+        components = self._get_core_components(logs)
+        db_render = self._get_rules()['render']
+        if db_render:
+            logs.append("┃")
+            logs.append(f"┃ [渲染] 正在应用 {len(db_render)} 条专家规则进行 L3 修正...")
+            local_result = {k: l1_info[k] for k in ("cn_name", "en_name", "season", "episode")}
+            with self.tracer.span("render.rules", final_dict.get("path")):
+                await components["render_engine"].apply_rules(final_result=final_dict, local_result=local_result, raw_filename=final_dict["filename"], rules=db_render, logs=logs, tmdb_provider=self._tmdb_provider(components))
+            logs.append(f"┗ ✅ 专家渲染流程结束")
 
-            if self.config.get('with_cloud') and self.config.get('tmdb_api_key'):
+        final_dict["duration"] = f"{time.time() - start_time:.2f}s"
+        logs.append(f"🏁 --- [识别任务结束: {final_dict['duration']}] ---")
+        
+        # 缩进排版的完整 JSON 只在调试模式下生成；界面选中文件时会按需渲染结果
+        if self.config.get('debug_mode'):
+            logs.append(json.dumps(final_dict, ensure_ascii=False, indent=4))
+        
+        return RecognitionResult(final_dict, logs)
+
+    async def _async_recognize(self, filename_path: str) -> RecognitionResult:
+        start_time = time.time()
+        logs = []
+        components = self._get_core_components(logs)
+        if not components:
+            return RecognitionResult({"title": "内核未就绪"}, logs + ["┗ ❌ 内核缺失，请在设置中下载算法。"])
+
+        try:
+            logs.extend(self.begin_logs())
+            final_dict, l1_info, l1_logs = self.local_recognize(filename_path)
+            logs.extend(l1_logs)
+            if final_dict is None:
+                return RecognitionResult({"title": "识别失败"}, logs)
+
+            if self.cloud_enabled():
                 logs.append("┃")
                 logs.append("┃ [联动] 正在启动云端元数据对撞流程...")
-                tmdb_client = components["tmdb"](api_key=self.config['tmdb_api_key'], proxy=self.config.get('tmdb_proxy'))
-                cloud_data = None
-                
-                if not final_dict["tmdb_id"] and self.config.get('use_storage'):
-                    memory = components["storage"].get_memory(f"{meta.cn_name or meta.en_name}|{meta.year}")
-                    if memory: 
-                        final_dict["tmdb_id"] = memory['tmdb_id']
-                        logs.append(f"┃ [记忆] ⚡ 命中心特征指纹，自动锁定 ID: {final_dict['tmdb_id']}")
-                
-                if final_dict["tmdb_id"]:
-                    cloud_data = await tmdb_client.get_details(final_dict["tmdb_id"], m_type_en, logs)
-                else:
-                    cloud_data = await tmdb_client.smart_search(meta.cn_name, meta.en_name, meta.year, m_type_en, logs, anime_priority=self.config.get('anime_priority', True))
-                    
-                    if not cloud_data and self.config.get('bgm_failover'):
-                        logs.append("┃ [救灾] TMDB 检索无结果，触发 Bangumi 故障转移...")
-                        bgm = components["bgm"](token=self.config.get('bangumi_token'), proxy=self.config.get('bangumi_proxy'))
-                        bgm_subject = await bgm.search_subject(meta.cn_name or meta.en_name, logs)
-                        if bgm_subject:
-                            cloud_data = await bgm.map_to_tmdb(bgm_subject, tmdb_api_key=self.config['tmdb_api_key'], logs=logs, tmdb_proxy=self.config.get('tmdb_proxy'))
-
-                if cloud_data:
-                    logs.append(f"┗ ✅ 云端对撞成功: {cloud_data.get('title') or cloud_data.get('name')} (ID: {cloud_data.get('id')})")
-                    final_dict.update({
-                        "title": cloud_data.get("title") or cloud_data.get("name") or final_dict["title"],
-                        "tmdb_id": str(cloud_data.get("id", "")),
-                        "poster_path": cloud_data.get("poster_path", ""),
-                        "release_date": cloud_data.get("release_date") or cloud_data.get("first_air_date") or "",
-                        "vote_average": float(cloud_data.get("vote_average", 0.0)),
-                        "origin_country": ", ".join(cloud_data.get("origin_country", [])) if isinstance(cloud_data.get("origin_country"), list) else ""
-                    })
-                    if not final_dict["year"] and final_dict["release_date"]: final_dict["year"] = final_dict["release_date"][:4]
-                    
-                    if self.config.get('use_storage'):
-                        components["storage"].set_memory(f"{meta.cn_name or meta.en_name}|{meta.year}", str(cloud_data.get('id')), m_type_en, final_dict["season"])
-                else:
-                    logs.append("┗ ❌ 云端对撞未发现高置信度匹配")
-
-            if db_render:
-                logs.append("┃")
-                logs.append(f"┃ [渲染] 正在应用 {len(db_render)} 条专家规则进行 L3 修正...")
-                l1_info = {"cn_name": meta.cn_name, "en_name": meta.en_name, "season": meta.begin_season, "episode": meta.begin_episode}
-                await components["render_engine"].apply_rules(final_result=final_dict, local_result=l1_info, raw_filename=original_filename, rules=db_render, logs=logs, tmdb_provider=tmdb_client if 'tmdb_client' in locals() else None)
-                logs.append(f"┗ ✅ 专家渲染流程结束")
+                self.apply_cloud(final_dict, await self.cloud_lookup(final_dict, l1_info, logs), logs)
 
-            final_dict["duration"] = f"{time.time() - start_time:.2f}s"
-            logs.append(f"🏁 --- [识别任务结束: {final_dict['duration']}] ---")
-            
-            # --- 优化点：使用缩进排版输出 JSON，一行一个字段 ---
-            logs.append(json.dumps(final_dict, ensure_ascii=False, indent=4))
-            
-            return RecognitionResult(final_dict, logs)
+            return await self.finalize(final_dict, l1_info, logs, time.time() - start_time)
 
         except Exception as e:
             logs.append(f"[CRITICAL] 识别流程崩溃: {str(e)}\n{traceback.format_exc()}")
@@ -0,0 +1,73 @@
+import re
+
+_REGEX_META = set('.^$*+?{}[]\\|()')
+
+def _is_literal(pattern):
+    return bool(pattern) and not (_REGEX_META & set(pattern))
+
+class _RegexStep:
+    __slots__ = ('compiled', 'replacement')
+
+    def __init__(self, compiled, replacement):
+        self.compiled = compiled
+        self.replacement = replacement
+
+    def apply(self, text):
+        return self.compiled.sub(self.replacement, text)
+
+class _LiteralRun:
+    """
+    连续的纯字面量规则合并为一步：先用一个合并后的正则判断是否出现任一字面量，
+    绝大多数文件名一条都不命中，一次 search 即可跳过整段；命中时再按原顺序 str.replace，
+    结果与逐条 re.sub 完全一致。
+    """
+    __slots__ = ('rules', 'prefilter')
+
+    def __init__(self, rules):
+        self.rules = tuple(rules)
+        self.prefilter = re.compile("|".join(re.escape(lit) for lit, _ in self.rules))
+
+    def apply(self, text):
+        if not self.prefilter.search(text):
+            return text
+        for literal, replacement in self.rules:
+            if literal in text:
+                text = text.replace(literal, replacement)
+        return text
+
+class RegexRuleChain:
+    """
+    预编译的噪声清洗规则链 (来自 SettingsTab.parse_regex_rules 的 (pattern, replacement) 列表)。
+    规则在构造时一次性编译并校验，无效规则记录在 errors 中并被跳过，不再在每个文件上静默失败。
+    """
+    def __init__(self, rules=None):
+        self.steps = []
+        self.errors = []
+        literals = []
+        for index, (pattern_str, replacement) in enumerate(rules or [], 1):
+            flags = 0
+            if pattern_str.startswith('(?i)') or pattern_str.startswith('(?I)'):
+                pattern_str, flags = pattern_str[4:], re.IGNORECASE
+            if not flags and _is_literal(pattern_str) and '\\' not in replacement:
+                literals.append((pattern_str, replacement))
+                continue
+            try:
+                compiled = re.compile(pattern_str, flags)
+                compiled.sub(replacement, "")  # 提前校验替换串中的分组引用
+            except re.error as e:
+                self.errors.append(f"第 {index} 条规则 [{pattern_str} => {replacement}] 无效: {str(e)}")
+                continue
+            if literals:
+                self.steps.append(_LiteralRun(literals))
+                literals = []
+            self.steps.append(_RegexStep(compiled, replacement))
+        if literals:
+            self.steps.append(_LiteralRun(literals))
+
+    def apply(self, text):
+        for step in self.steps:
+            text = step.apply(text)
+        return text
+
+    def __len__(self):
+        return len(self.steps)
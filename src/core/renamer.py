@@ -1,6 +1,105 @@
 import os
 import re
+import sys
+import errno
+import shutil
 import traceback
+from src.core.template import CompiledTemplate, TemplateError
+from src.core.regex_chain import RegexRuleChain
+from src.core.plan import RenamePlan
+
+_ILLEGAL_CHARS = re.compile(r'[<>:"/\\|?*]')
+_DIGITS = re.compile(r'\d+')
+
+_COPY_CHUNK = 8 * 1024 * 1024
+_COPY_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EBADF, errno.ENOTSUP, errno.EOPNOTSUPP}
+
+# 整理方式：move 移动原文件；hardlink/symlink 保留原文件 (做种) 仅在目标位置建链接；
+# link 优先硬链接，跨设备或文件系统不支持时退回软链接
+ORGANIZE_MODES = {"move": "移动", "hardlink": "硬链接", "symlink": "软链接", "link": "链接 (优先硬链接)"}
+_HARDLINK_FALLBACK_ERRNOS = {errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EOPNOTSUPP}
+
+def _read_write(src_fd, dst_fd, count):
+    data = os.read(src_fd, count)
+    view, written = memoryview(data), 0
+    while written < len(data):
+        written += os.write(dst_fd, view[written:])
+    return len(data)
+
+def _copy_chunks(src_fd, dst_fd, size, progress=None):
+    """
+    分块拷贝文件内容：优先 copy_file_range (同文件系统内核态/reflink)，其次 sendfile (Linux)，
+    最后退回普通读写。progress(copied, size) 返回 False 时中止拷贝。
+    """
+    methods = []
+    if hasattr(os, "copy_file_range"):
+        methods.append(lambda n: os.copy_file_range(src_fd, dst_fd, n))
+    if sys.platform.startswith("linux"):
+        methods.append(lambda n: os.sendfile(dst_fd, src_fd, None, n))
+    methods.append(lambda n: _read_write(src_fd, dst_fd, n))
+    copied = 0
+    while copied < size:
+        try:
+            n = methods[0](min(_COPY_CHUNK, size - copied))
+        except OSError as e:
+            if e.errno in _COPY_FALLBACK_ERRNOS and len(methods) > 1:
+                methods.pop(0)  # 偏移量未变化，换下一种方式从当前位置继续
+                continue
+            raise
+        if n == 0: break  # 源文件在拷贝过程中被截断
+        copied += n
+        if progress and progress(copied, size) is False:
+            raise InterruptedError("已取消")
+    return copied
+
+def _strip_ext(val):
+    # --- 后缀剥离工具 ---
+    if not val: return ""
+    return os.path.splitext(str(val))[0]
+
+class _FieldContext:
+    """单个文件渲染所需的原始数据，字段值由 _FIELD_GETTERS 按需计算"""
+    __slots__ = ('data', 'season', 'episode', 'tmdb_id', 'file_no_ext', 'old_path')
+
+    def __init__(self, data, season, episode, tmdb_id, file_no_ext, old_path):
+        self.data = data
+        self.season = season
+        self.episode = episode
+        self.tmdb_id = tmdb_id
+        self.file_no_ext = file_no_ext
+        self.old_path = old_path
+
+def _data_field(name, default=''):
+    return lambda c: c.data.get(name, default)
+
+# 占位符定义 (严格遵循官方要求)
+_FIELD_GETTERS = {
+    'title': _data_field('title'),
+    'tmdb_id': lambda c: c.tmdb_id,
+    'category': _data_field('category'),
+    'processed_name': lambda c: _strip_ext(c.data.get('processed_name', '')), # 渲染后标题 (剥离后缀)
+    'poster_path': _data_field('poster_path'),
+    'release_date': _data_field('release_date'),
+    'season': lambda c: str(c.season),
+    'season_02': lambda c: str(c.season).zfill(2),
+    'episode': lambda c: str(c.episode),
+    'episode_02': lambda c: str(c.episode).zfill(2),
+    'team': _data_field('team'),
+    'resolution': _data_field('resolution'),
+    'video_encode': _data_field('video_encode'),
+    'video_effect': _data_field('video_effect'),
+    'audio_encode': _data_field('audio_encode'),
+    'subtitle': _data_field('subtitle'),
+    'source': _data_field('source'),
+    'platform': _data_field('platform'),
+    'origin_country': _data_field('origin_country'),
+    'vote_average': _data_field('vote_average', 0.0),
+    'year': _data_field('year'),
+    'duration': _data_field('duration'),
+    'filename': lambda c: _strip_ext(c.data.get('filename', c.file_no_ext)), # 原始名 (剥离后缀)
+    'path': lambda c: c.data.get('path', c.old_path),
+}
+PLACEHOLDERS = tuple(_FIELD_GETTERS)
 
 class RenameEngine:
     """基于官方 22 字段全信托结论的重命名引擎"""
@@ -11,16 +110,41 @@ class RenameEngine:
         self.movie_folder_format = movie_folder_format
         self.season_format = season_format
         self.regex_rules = regex_rules or []
+        # 噪声清洗规则同样只编译一次，无效规则见 regex_chain.errors
+        self.regex_chain = RegexRuleChain(self.regex_rules)
+
+        # 格式串在构造时一次性编译，未知占位符直接抛出 TemplateError
+        self._tv = (CompiledTemplate(rename_format, PLACEHOLDERS), CompiledTemplate(folder_format, PLACEHOLDERS))
+        self._movie = (CompiledTemplate(movie_format, PLACEHOLDERS), CompiledTemplate(movie_folder_format, PLACEHOLDERS))
+        self._season = CompiledTemplate(season_format, PLACEHOLDERS)
+        self._fields = {
+            is_movie: tuple(dict.fromkeys(templates[0].fields + templates[1].fields + self._season.fields))
+            for is_movie, templates in ((False, self._tv), (True, self._movie))
+        }
+
+    @classmethod
+    def from_config(cls, config_data):
+        """按任务配置 (SettingsTab.get_config_data / config_from_store 的结果) 构造"""
+        return cls(
+            rename_format=config_data.get('rename_format'),
+            movie_format=config_data.get('movie_format'),
+            folder_format=config_data.get('folder_format'),
+            movie_folder_format=config_data.get('movie_folder_format'),
+            season_format=config_data.get('season_format'),
+            regex_rules=config_data.get('regex_rules', [])
+        )
+
+    @staticmethod
+    def validate_formats(*formats):
+        """返回所有格式串的错误信息列表 (供设置页保存前校验)"""
+        errors = []
+        for fmt in formats:
+            try: CompiledTemplate(fmt, PLACEHOLDERS)
+            except TemplateError as e: errors.append(str(e))
+        return errors
 
     def apply_regex_rules(self, text):
-        for pattern_str, replacement in self.regex_rules:
-            try:
-                flags = 0
-                if pattern_str.startswith('(?i)') or pattern_str.startswith('(?I)'):
-                    pattern_str, flags = pattern_str[4:], re.IGNORECASE
-                text = re.sub(pattern_str, replacement, text, flags=flags)
-            except re.error: continue
-        return text
+        return self.regex_chain.apply(text)
 
     def build_paths(self, old_path, rec_result, custom_settings=None):
         old_filename = os.path.basename(old_path)
@@ -28,93 +152,142 @@ class RenameEngine:
         file_no_ext, ext = os.path.splitext(old_filename)
 
         # 1. 获取全量 22 字段
-        format_data = rec_result.to_dict().copy()
+        format_data = rec_result.to_dict()
         is_movie = (format_data.get('category') == "电影")
         
         # 2. 补全/修正辅助字段 (s_val, e_val 用于补零逻辑)
         s_val = format_data.get('season', 1)
         e_val = format_data.get('episode', '1')
+        tmdb_id = format_data.get('tmdb_id', '')
         
         # 3. 处理自定义覆盖逻辑
         if custom_settings:
             if custom_settings.get('tmdb_id_override'):
-                format_data['tmdb_id'] = custom_settings['tmdb_id_override']
+                tmdb_id = custom_settings['tmdb_id_override']
             if custom_settings.get('custom_season_enabled'):
                 s_val = custom_settings['custom_season_value']
             if custom_settings.get('custom_episode_offset_enabled'):
                 try:
                     offset = int(custom_settings.get('custom_episode_offset_value', 0))
-                    original_ep = int(re.search(r'\d+', str(e_val)).group()) if re.search(r'\d+', str(e_val)) else 1
+                    m = _DIGITS.search(str(e_val))
+                    original_ep = int(m.group()) if m else 1
                     e_val = str(max(1, original_ep + offset))
                 except: pass
 
-        # --- 后缀剥离工具 ---
-        def safe_strip(val):
-            if not val: return ""
-            return os.path.splitext(str(val))[0]
-
-        # 4. 重新映射占位符字典 (严格遵循官方要求)
-        final_placeholders = {
-            'title': format_data.get('title', ''),
-            'tmdb_id': format_data.get('tmdb_id', ''),
-            'category': format_data.get('category', ''),
-            'processed_name': safe_strip(format_data.get('processed_name', '')), # 渲染后标题 (剥离后缀)
-            'poster_path': format_data.get('poster_path', ''),
-            'release_date': format_data.get('release_date', ''),
-            'season': str(s_val),
-            'season_02': str(s_val).zfill(2),
-            'episode': str(e_val),
-            'episode_02': str(e_val).zfill(2),
-            'team': format_data.get('team', ''),
-            'resolution': format_data.get('resolution', ''),
-            'video_encode': format_data.get('video_encode', ''),
-            'video_effect': format_data.get('video_effect', ''),
-            'audio_encode': format_data.get('audio_encode', ''),
-            'subtitle': format_data.get('subtitle', ''),
-            'source': format_data.get('source', ''),
-            'platform': format_data.get('platform', ''),
-            'origin_country': format_data.get('origin_country', ''),
-            'vote_average': format_data.get('vote_average', 0.0),
-            'year': format_data.get('year', ''),
-            'duration': format_data.get('duration', ''),
-            'filename': safe_strip(format_data.get('filename', file_no_ext)), # 原始名 (剥离后缀)
-            'path': format_data.get('path', old_path)
-        }
+        # 4. 只计算模板实际引用到的占位符
+        ctx = _FieldContext(format_data, s_val, e_val, tmdb_id, file_no_ext, old_path)
+        values = {name: _FIELD_GETTERS[name](ctx) for name in self._fields[is_movie]}
 
         # 5. 生成结果
-        file_template = self.movie_format if is_movie else self.rename_format
-        folder_template = self.movie_folder_format if is_movie else self.folder_format
+        file_template, folder_template = self._movie if is_movie else self._tv
         
         # 文件名
-        new_filename = file_template
-        for k, v in final_placeholders.items():
-            new_filename = new_filename.replace(f'{{{k}}}', str(v))
-        new_filename = self.apply_regex_rules(new_filename)
-        new_filename = re.sub(r'[<>:"/\\|?*]', '_', new_filename).strip(" .")
+        new_filename = self.apply_regex_rules(file_template.render(values))
+        new_filename = _ILLEGAL_CHARS.sub('_', new_filename).strip(" .")
 
         # 主文件夹
-        main_folder = folder_template
-        for k, v in final_placeholders.items():
-            main_folder = main_folder.replace(f'{{{k}}}', str(v))
-        main_folder = re.sub(r'[<>:"/\\|?*]', '_', main_folder).strip(" .")
+        main_folder = _ILLEGAL_CHARS.sub('_', folder_template.render(values)).strip(" .")
 
         # 季文件夹
         season_folder = ""
         if not is_movie or (custom_settings and custom_settings.get('custom_season_enabled')):
-            if self.season_format.strip():
-                season_folder = self.season_format
-                for k, v in final_placeholders.items():
-                    season_folder = season_folder.replace(f'{{{k}}}', str(v))
-                season_folder = re.sub(r'[<>:"/\\|?*]', '_', season_folder).strip(" .")
+            if self._season:
+                season_folder = _ILLEGAL_CHARS.sub('_', self._season.render(values)).strip(" .")
 
         target_dir = os.path.join(old_dir, main_folder, season_folder) if season_folder else os.path.join(old_dir, main_folder)
         return os.path.join(target_dir, f"{new_filename}{ext}"), main_folder, season_folder
 
-    def execute_rename(self, old_path, new_path):
+    def plan_file(self, plan, old_path, rec_result, custom_settings=None):
+        """为单个文件生成目标并登记到 plan，返回带状态的 RenamePlanItem (流式批处理逐个调用)"""
+        new_path, main_folder, season_folder = self.build_paths(old_path, rec_result, custom_settings)
+        return plan.add(old_path, new_path, main_folder, season_folder, recognized="path" in rec_result.to_dict())
+
+    def build_plan(self, entries, custom_settings=None, plan=None):
+        """
+        批量生成目标计划：entries 为整批 (原路径, RecognitionResult)。
+        返回的 RenamePlan 已标记同批次内的目标重复与磁盘上已存在的目标，执行前即可发现冲突。
+        """
+        plan = plan if plan is not None else RenamePlan()
+        for old_path, rec_result in entries:
+            self.plan_file(plan, old_path, rec_result, custom_settings)
+        return plan
+
+    @staticmethod
+    def move_across_devices(old_path, new_path, progress=None):
+        """
+        跨设备移动：先拷贝到同目录的 .part 临时文件，校验大小并保留时间戳后再改名为目标，
+        最后删除源文件。任何一步失败或被取消都会清理临时文件，不留下半截文件。
+        目标落盘后源文件删除失败不算移动失败，返回告警文本 (源文件被保留)，否则返回 None。
+        """
+        size = os.path.getsize(old_path)
+        part = new_path + ".part"
+        if os.path.exists(part): os.remove(part)  # 上次中断遗留
+        try:
+            with open(old_path, "rb") as fsrc, open(part, "xb") as fdst:
+                copied = _copy_chunks(fsrc.fileno(), fdst.fileno(), size, progress)
+                fdst.flush()
+                os.fsync(fdst.fileno())
+            if copied != size or os.path.getsize(part) != size:
+                raise OSError(errno.EIO, f"大小校验失败: 已拷贝 {copied} / {size} 字节")
+            shutil.copystat(old_path, part)
+            os.rename(part, new_path)
+        except BaseException:
+            try:
+                os.remove(part)
+            except OSError:
+                pass
+            raise
+        try:
+            os.remove(old_path)
+        except OSError as e:
+            return f"目标已写入，但源文件删除失败，已保留源文件: {e}"
+        return None
+
+    @staticmethod
+    def create_link(old_path, new_path, mode):
+        """在 new_path 建立指向 old_path 的链接，返回实际使用的方式 ("hardlink"/"symlink")"""
+        if mode in ("hardlink", "link"):
+            try:
+                os.link(old_path, new_path)
+                return "hardlink"
+            except OSError as e:
+                if mode == "hardlink" or e.errno not in _HARDLINK_FALLBACK_ERRNOS: raise
+        os.symlink(os.path.abspath(old_path), new_path)
+        return "symlink"
+
+    @staticmethod
+    def remove_link(link_path, source_path):
+        """撤销链接模式的操作：确认 link_path 确实是指向 source_path 的链接后删除"""
+        try:
+            if os.path.islink(link_path):
+                same = os.path.realpath(link_path) == os.path.realpath(source_path)
+            else:
+                same = os.path.samefile(link_path, source_path)
+            if not same: return False, f"目标已不是原文件的链接: {link_path}"
+            os.remove(link_path)
+            return True, "成功"
+        except Exception as e: return False, str(e)
+
+    @staticmethod
+    def execute_rename(old_path, new_path, make_dirs=True, progress=None, mode="move"):
+        """
+        make_dirs=False 时由调用方 (BatchExecutor) 负责按目录一次性创建目标文件夹。
+        move 模式下源与目标不在同一设备时自动改为拷贝+删除，progress(copied, size) 报告字节进度；
+        其余模式见 ORGANIZE_MODES，原文件保持不动。
+        """
         if os.path.normpath(old_path) == os.path.normpath(new_path): return True, "无需重命名"
-        if os.path.exists(new_path): return False, f"目标已存在: {new_path}"
+        if os.path.lexists(new_path): return False, f"目标已存在: {new_path}"
         try:
-            os.makedirs(os.path.dirname(new_path), exist_ok=True)
-            os.rename(old_path, new_path)
+            if make_dirs:
+                os.makedirs(os.path.dirname(new_path), exist_ok=True)
+            if mode != "move":
+                used = RenameEngine.create_link(old_path, new_path, mode)
+                return True, f"{ORGANIZE_MODES[used]}成功"
+            try:
+                os.rename(old_path, new_path)
+            except OSError as e:
+                if e.errno != errno.EXDEV: raise
+                warning = RenameEngine.move_across_devices(old_path, new_path, progress)
+                return True, f"跨设备移动成功 ({warning})" if warning else "跨设备移动成功"
             return True, "成功"
         except Exception as e: return False, str(e)
@@ -1,10 +1,47 @@
 import requests
 import datetime
+import hashlib
+import threading
 import traceback
-from src.utils.database import LocalRule, RemoteSubscription, SubscriptionCache
+from typing import NamedTuple
+from src.utils.database import RemoteSubscription, SubscriptionCache, RuleLine, replace_rule_lines
+
+RULE_CATEGORIES = ('noise', 'group', 'privileged', 'render')
+
+class RuleSnapshot(NamedTuple):
+    """某一时刻全部分类规则的不可变快照"""
+    version: int
+    digest: str
+    noise: tuple
+    group: tuple
+    privileged: tuple
+    render: tuple
 
 class RuleManager:
     """管理规则的同步与合并逻辑"""
+    _version = 1
+    _snapshot = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def invalidate(cls):
+        """规则写入后调用：版本号递增，下次 get_snapshot() 时重建快照"""
+        with cls._lock:
+            cls._version += 1
+
+    @classmethod
+    def get_snapshot(cls) -> RuleSnapshot:
+        """返回当前版本的规则快照，版本未变化时直接复用内存中的对象"""
+        with cls._lock:
+            if cls._snapshot is None or cls._snapshot.version != cls._version:
+                rules = {c: tuple(cls.get_merged_rules(c)) for c in RULE_CATEGORIES}
+                digest = hashlib.sha1()
+                for c in RULE_CATEGORIES:
+                    digest.update(f"[{c}]\n".encode())
+                    digest.update("\n".join(rules[c]).encode())
+                cls._snapshot = RuleSnapshot(cls._version, digest.hexdigest(), **rules)
+            return cls._snapshot
+
     @staticmethod
     def sync_subscription(sub_id):
         try:
@@ -25,6 +62,9 @@ class RuleManager:
             
             sub.last_updated = datetime.datetime.now()
             sub.save()
+            if sub.enabled:
+                replace_rule_lines(sub.category, f"sub:{sub.id}", content)
+            RuleManager.invalidate()
             return True, "同步成功"
         except Exception as e:
             return False, str(e)
@@ -33,23 +73,13 @@ class RuleManager:
     def get_merged_rules(category: str):
         """
         根据分类加载合并后的规则列表。
-        使用更稳健的 Peewee 查询语法。
+        规则行在保存/同步时已展开进 RuleLine 索引表，这里只需一次去重排序查询，
+        耗时与订阅数量无关。
         """
-        rules = []
-        
-        # 1. 加载本地规则 (使用关键字参数查询)
-        local_rule = LocalRule.get_or_none(category=category, enabled=True)
-        if local_rule and local_rule.content:
-            lines = [line.strip() for line in local_rule.content.splitlines() if line.strip()]
-            rules.extend(lines)
-            
-        # 2. 加载该分类下所有远程缓存内容
-        subs = RemoteSubscription.select().where(RemoteSubscription.category == category, RemoteSubscription.enabled == True)
-        for sub in subs:
-            cache = SubscriptionCache.get_or_none(subscription=sub)
-            if cache and cache.content:
-                lines = [line.strip() for line in cache.content.splitlines() if line.strip()]
-                rules.extend(lines)
-        
-        # 去重
-        return sorted(list(set(rules)))
+        query = (RuleLine
+                 .select(RuleLine.line)
+                 .where(RuleLine.category == category)
+                 .distinct()
+                 .order_by(RuleLine.line)
+                 .tuples())
+        return [line for (line,) in query]
@@ -0,0 +1,53 @@
+from src.utils.scanner import DEFAULT_SKIP_DIRS, parse_skip_dirs
+from src.utils.watcher import watch_dirs_from_text
+
+# 设置项及默认值：界面 (SettingsTab) 与命令行 (cli.py) 共用；bool/int 默认值同时决定读取时的类型
+DEFAULTS = {
+    "rename_format": "S{season_02}E{episode_02} - {filename}",
+    "folder_format": "({year}){title}[tmdbid={tmdb_id}]",
+    "season_format": "Season {season}",
+    "movie_format": "{title} ({year}) [{resolution}][{video_encode}]",
+    "movie_folder_format": "({year}){title}[tmdbid={tmdb_id}]",
+    "organize_mode": "move",
+    "scan_skip_dirs": ", ".join(DEFAULT_SKIP_DIRS),
+    "watch_dirs": "",
+    "watch_stable_seconds": 10,
+    "regex_rules": "",
+    "with_cloud": True,
+    "tmdb_api_key": "",
+    "tmdb_proxy": "",
+    "bangumi_token": "",
+    "bangumi_proxy": "",
+    "cloud_base_url": "",
+    "use_storage": True,
+    "anime_priority": True,
+    "bgm_failover": True,
+    "max_concurrency": 8,
+    "l1_processes": 0,
+    "rename_workers": 8,
+    "result_cache": True,
+    "debug_mode": False,
+    "trace_export": False,
+}
+
+def parse_regex_rules(text):
+    """每行一条 "模式 => 替换"，没有 => 的行忽略"""
+    rules = []
+    for line in text.splitlines():
+        if '=>' in line:
+            p, r = line.split('=>', 1); rules.append((p.strip(), r.strip()))
+    return rules
+
+def config_from_store(store):
+    """
+    从配置存储 (ConfigManager 或 IniSettings) 读出整份任务配置，
+    结构与 SettingsTab.get_config_data() 一致。
+    """
+    data = {}
+    for key, default in DEFAULTS.items():
+        value = store.get_value(key, default, type=type(default))
+        data[key] = value.strip() if isinstance(value, str) else value
+    data["scan_skip_dirs"] = parse_skip_dirs(data["scan_skip_dirs"])
+    data["watch_dirs"] = watch_dirs_from_text(data["watch_dirs"])
+    data["regex_rules"] = parse_regex_rules(data["regex_rules"])
+    return data
@@ -0,0 +1,34 @@
+import asyncio
+
+class SingleFlight:
+    """
+    同一批次内的云端请求合并表。
+    相同 key 只由第一个调用者真正发起请求，其余并发调用者等待同一个 future；
+    成功的结果在批次内保留，后到的同系列文件直接复用。
+    失败的请求 (抛出异常，或 keep(结果) 为假，如云端未命中) 只交给正在等待的调用者，不保留，允许后续重试。
+    """
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, factory, keep=None):
+        """执行 factory() 并返回 (结果, 是否复用了他人的请求)；keep 判定结果是否在批次内保留"""
+        future = self._calls.get(key)
+        if future is not None:
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await factory()
+        except BaseException as e:
+            self._calls.pop(key, None)
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # 标记为已读取，无人等待时也不会产生告警
+            raise
+        future.set_result(result)
+        if keep is not None and not keep(result):
+            self._calls.pop(key, None)
+        return result, False
@@ -0,0 +1,37 @@
+import re
+
+_PLACEHOLDER_RE = re.compile(r'\{(\w+)\}')
+
+class TemplateError(ValueError):
+    """格式串中引用了不存在的占位符"""
+
+class CompiledTemplate:
+    """
+    预编译的重命名格式串。
+    构造时拆分为字面量与字段名交替的片段列表并校验占位符，
+    渲染时只需按片段拼接，fields 给出模板实际引用到的字段，便于调用方按需计算。
+    """
+    __slots__ = ('source', 'segments', 'fields')
+
+    def __init__(self, template, allowed):
+        self.source = template or ""
+        segments, fields, pos = [], [], 0
+        for m in _PLACEHOLDER_RE.finditer(self.source):
+            name = m.group(1)
+            if name not in allowed:
+                raise TemplateError(f"未知占位符 {{{name}}}: {self.source}")
+            if m.start() > pos:
+                segments.append((False, self.source[pos:m.start()]))
+            segments.append((True, name))
+            if name not in fields: fields.append(name)
+            pos = m.end()
+        if pos < len(self.source):
+            segments.append((False, self.source[pos:]))
+        self.segments = tuple(segments)
+        self.fields = tuple(fields)
+
+    def render(self, values):
+        return "".join(str(values[part]) if is_field else part for is_field, part in self.segments)
+
+    def __bool__(self):
+        return bool(self.source.strip())
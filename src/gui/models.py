@@ -0,0 +1,144 @@
+import os
+from PyQt6.QtCore import Qt, QAbstractListModel, QAbstractTableModel, QSortFilterProxyModel, QModelIndex
+from PyQt6.QtGui import QColor
+
+class PathStore:
+    """有序、去重的路径集合：追加与查重均为 O(1)，顺序即加入顺序"""
+    def __init__(self):
+        self._index = {}
+        self._items = []
+
+    def missing(self, paths):
+        """paths 中尚未收录的部分 (同批重复只保留第一次)，不修改 store"""
+        index = self._index
+        return [p for p in dict.fromkeys(paths) if p not in index]
+
+    def extend(self, paths):
+        """追加路径，返回实际新增的部分 (已存在或同批重复的会被忽略)"""
+        added = self.missing(paths)
+        self._index.update(zip(added, range(len(self._items), len(self._items) + len(added))))
+        self._items.extend(added)
+        return added
+
+    def remove_rows(self, rows):
+        drop = set(rows)
+        self._items = [p for i, p in enumerate(self._items) if i not in drop]
+        self._index = {p: i for i, p in enumerate(self._items)}
+
+    def clear(self):
+        self._index.clear()
+        self._items.clear()
+
+    def paths(self):
+        return list(self._items)
+
+    def __getitem__(self, row):
+        return self._items[row]
+
+    def __contains__(self, path):
+        return path in self._index
+
+    def __len__(self):
+        return len(self._items)
+
+class PathListModel(QAbstractListModel):
+    """文件列表的数据模型，视图只渲染可见行"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.store = PathStore()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid(): return None
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return self.store[index.row()]
+        return None
+
+    def add_paths(self, paths):
+        """批量追加：先在 store 中查重，再一次性通知视图插入新增的行"""
+        added = self.store.missing(paths)
+        if added:
+            start = len(self.store)
+            self.beginInsertRows(QModelIndex(), start, start + len(added) - 1)
+            self.store.extend(added)  # added 已去重，这里的二次查重只是 O(k) 的字典查找
+            self.endInsertRows()
+        return added
+
+    def remove_rows(self, rows):
+        if not rows: return
+        self.beginResetModel()
+        self.store.remove_rows(rows)
+        self.endResetModel()
+
+    def clear(self):
+        self.beginResetModel()
+        self.store.clear()
+        self.endResetModel()
+
+    def paths(self):
+        return self.store.paths()
+
+class PreviewTableModel(QAbstractTableModel):
+    """
+    预览/结果表格的数据模型。
+    工作线程把结果攒成批次再投递 (RenameWorker.preview_signal)，每批只做一次 beginInsertRows，
+    跨线程事件数与 UI 线程的开销都与文件数无关，表格也不再为每个单元格创建 QTableWidgetItem。
+    """
+    HEADERS = ["原文件名", "新文件名", "目标主文件夹", "目标季文件夹", "状态"]
+    STATUS_COLORS = {"conflict": QColor("#d32f2f"), "failed": QColor("#9e9e9e")}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []      # (原路径, 原文件名, 新文件名, 主文件夹, 季文件夹, 状态文字, 状态)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid(): return None
+        row = self.rows[index.row()]
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return row[0] if role == Qt.ItemDataRole.ToolTipRole and index.column() == 0 else row[index.column() + 1]
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return self.STATUS_COLORS.get(row[6])
+        return None
+
+    def append_rows(self, items):
+        """items: [(原路径, 新文件名, 主文件夹, 季文件夹, 状态, 状态文字), ...]"""
+        if not items: return
+        start = len(self.rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(items) - 1)
+        self.rows.extend((source, os.path.basename(source), new_name, main_folder, season_folder, label, status)
+                         for source, new_name, main_folder, season_folder, status, label in items)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self.rows = []
+        self.endResetModel()
+
+    def source_path(self, row):
+        return self.rows[row][0]
+
+class PreviewFilterProxy(QSortFilterProxyModel):
+    """按状态过滤预览行 (statuses 为 None 表示全部显示)，排序沿用 QSortFilterProxyModel"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.statuses = None
+
+    def set_statuses(self, statuses):
+        self.statuses = set(statuses) if statuses else None
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        return self.statuses is None or self.sourceModel().rows[source_row][6] in self.statuses
@@ -4,7 +4,7 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                              QGroupBox, QPlainTextEdit, QScrollArea, QLabel, 
                              QMessageBox, QFrame)
 from PyQt6.QtCore import Qt
-from src.utils.database import LocalRule, RemoteSubscription, SubscriptionCache, db
+from src.utils.database import LocalRule, RemoteSubscription, SubscriptionCache, db, rebuild_rule_lines
 from src.core.rules import RuleManager
 
 class RuleSection(QGroupBox):
@@ -81,6 +81,8 @@ class RuleSection(QGroupBox):
             for url in new_urls:
                 if url not in existing_subs:
                     RemoteSubscription.create(name=f"{self.category}_sub", url=url, category=self.category)
+            rebuild_rule_lines(self.category)
+        RuleManager.invalidate()
 
 class RuleManagerWidget(QWidget):
     def __init__(self):
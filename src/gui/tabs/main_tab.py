@@ -1,13 +1,16 @@
 import os
 import urllib.parse
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QSplitter, 
-                             QGroupBox, QTextEdit, QPushButton, QTableWidget, 
-                             QTableWidgetItem, QProgressBar, QHeaderView, 
-                             QMessageBox, QFormLayout, QCheckBox, QLineEdit, QComboBox)
-from PyQt6.QtCore import Qt
-from src.gui.worker import RenameWorker
-
-VIDEO_EXTENSIONS = ['.mkv', '.mp4', '.avi', '.mov', '.wmv', '.ts', '.flv', '.webm', '.mpg', '.mpeg']
+                             QGroupBox, QPlainTextEdit, QPushButton, QTableView,
+                             QProgressBar, QHeaderView, 
+                             QMessageBox, QFormLayout, QCheckBox, QLineEdit, QComboBox,
+                             QFileDialog, QLabel, QListView, QAbstractItemView)
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtGui import QAction, QKeySequence
+from src.gui.worker import RenameWorker, UndoWorker, ScanWorker
+from src.gui.models import PathListModel, PreviewTableModel, PreviewFilterProxy
+from src.utils.scanner import VIDEO_EXTENSIONS
+from src.utils.logbuffer import LogBuffer, AuditLog, LOG_LEVELS
 
 class MainTab(QWidget):
     """
@@ -18,8 +21,16 @@ class MainTab(QWidget):
         super().__init__(parent_window)
         self.parent_window = parent_window
         self.layout = QVBoxLayout(self)
+        self.log_buffer = LogBuffer()
+        self.audit = AuditLog()
         self.init_ui()
         self.worker = None
+        self.scan_worker = None
+        self.pending_scan = []
+        self.pending_paths = []  # 预览/执行/撤销期间拖入的路径，任务结束后再加入列表
+        self.processing = False
+        self.groups = []
+        self.last_plan = None
 
     def init_ui(self):
         # --- 1. 上部：文件选择与自定义选项 ---
@@ -28,9 +39,17 @@ class MainTab(QWidget):
         # 1.1 左侧：文件列表
         file_group = QGroupBox("文件/文件夹选择")
         file_layout = QVBoxLayout()
-        self.file_list = QTextEdit()
-        self.file_list.setPlaceholderText("拖放文件/文件夹到此...")
+        self.path_model = PathListModel(self)
+        self.file_list = QListView()
+        self.file_list.setModel(self.path_model)
+        self.file_list.setUniformItemSizes(True) # 等高行，10 万级条目也只按可见区域布局
+        self.file_list.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
         self.file_list.setAcceptDrops(False) # 禁用默认拖拽，由容器处理
+        remove_action = QAction("移除选中", self.file_list)
+        remove_action.setShortcut(QKeySequence.StandardKey.Delete)
+        remove_action.triggered.connect(self.remove_selected_paths)
+        self.file_list.addAction(remove_action)
+        self.file_list.setContextMenuPolicy(Qt.ContextMenuPolicy.ActionsContextMenu)
         
         btn_layout = QHBoxLayout()
         self.browse_files_btn = QPushButton("浏览文件")
@@ -42,8 +61,10 @@ class MainTab(QWidget):
         btn_layout.addWidget(self.browse_files_btn)
         btn_layout.addWidget(self.browse_folder_btn)
         btn_layout.addWidget(self.clear_btn)
+        self.scan_label = QLabel("拖放文件/文件夹到此...")
         
         file_layout.addWidget(self.file_list)
+        file_layout.addWidget(self.scan_label)
         file_layout.addLayout(btn_layout)
         file_group.setLayout(file_layout)
         self.top_splitter.addWidget(file_group)
@@ -87,9 +108,31 @@ class MainTab(QWidget):
         # --- 2. 中部：预览表格 ---
         preview_group = QGroupBox("预览/结果")
         preview_layout = QVBoxLayout()
-        self.preview_table = QTableWidget(0, 4)
-        self.preview_table.setHorizontalHeaderLabels(["原文件名", "新文件名", "目标主文件夹", "目标季文件夹"])
+        filter_layout = QHBoxLayout()
+        self.preview_filter_combo = QComboBox()
+        self.preview_filter_combo.addItem("全部", None)
+        self.preview_filter_combo.addItem("仅冲突/失败", ["conflict", "failed"])
+        self.preview_filter_combo.addItem("仅就绪", ["ready"])
+        self.preview_filter_combo.addItem("仅无需重命名", ["noop"])
+        self.preview_filter_combo.currentIndexChanged.connect(
+            lambda: self.preview_proxy.set_statuses(self.preview_filter_combo.currentData()))
+        filter_layout.addWidget(QLabel("显示:"))
+        filter_layout.addWidget(self.preview_filter_combo)
+        filter_layout.addStretch()
+
+        self.preview_model = PreviewTableModel(self)
+        self.preview_model.rowsInserted.connect(self.follow_preview_tail)
+        self.preview_proxy = PreviewFilterProxy(self)
+        self.preview_proxy.setSourceModel(self.preview_model)
+        self.preview_table = QTableView()
+        self.preview_table.setModel(self.preview_proxy)
+        self.preview_table.setSortingEnabled(True)
+        self.preview_table.sortByColumn(-1, Qt.SortOrder.AscendingOrder) # 默认保持处理顺序
+        self.preview_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.preview_table.verticalHeader().setDefaultSectionSize(22)
         self.preview_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.preview_table.selectionModel().currentRowChanged.connect(self.show_file_detail)
+        preview_layout.addLayout(filter_layout)
         preview_layout.addWidget(self.preview_table)
         preview_group.setLayout(preview_layout)
         self.layout.addWidget(preview_group, 1)
@@ -98,10 +141,32 @@ class MainTab(QWidget):
         progress_group = QGroupBox("操作日志与进度")
         progress_layout = QVBoxLayout()
         self.progress_bar = QProgressBar()
-        self.log_output = QTextEdit()
+        level_layout = QHBoxLayout()
+        self.log_level_combo = QComboBox()
+        for label, level in (("调试", "DEBUG"), ("信息", "INFO"), ("警告", "WARN"), ("错误", "ERROR")):
+            self.log_level_combo.addItem(label, LOG_LEVELS[level])
+        self.log_level_combo.setCurrentIndex(1)
+        self.log_level_combo.currentIndexChanged.connect(self.refilter_logs)
+        level_layout.addWidget(QLabel("日志级别:"))
+        level_layout.addWidget(self.log_level_combo)
+        level_layout.addStretch()
+
+        # 左侧为批次日志 (环形缓冲，定时批量刷新)，右侧为预览表中选中文件的详细识别日志
+        log_splitter = QSplitter(Qt.Orientation.Horizontal)
+        self.log_output = QPlainTextEdit()
         self.log_output.setReadOnly(True)
+        self.log_output.setMaximumBlockCount(self.log_buffer.records.maxlen)
+        self.detail_output = QPlainTextEdit()
+        self.detail_output.setReadOnly(True)
+        self.detail_output.setPlaceholderText("在预览表中选中文件以查看其详细识别日志")
+        log_splitter.addWidget(self.log_output)
+        log_splitter.addWidget(self.detail_output)
         progress_layout.addWidget(self.progress_bar)
-        progress_layout.addWidget(self.log_output)
+        progress_layout.addLayout(level_layout)
+        progress_layout.addWidget(log_splitter)
+        self.log_timer = QTimer(self)
+        self.log_timer.timeout.connect(self.flush_logs)
+        self.log_timer.start(100)
         progress_group.setLayout(progress_layout)
         self.layout.addWidget(progress_group, 1)
 
@@ -111,11 +176,14 @@ class MainTab(QWidget):
         self.execute_btn = QPushButton("执行重命名")
         self.execute_btn.clicked.connect(lambda: self.start_processing(preview_only=False))
         self.execute_btn.setStyleSheet("background-color: #4CAF50; color: white; font-weight: bold;")
+        self.undo_btn = QPushButton("撤销上次执行")
+        self.undo_btn.clicked.connect(self.undo_last_run)
         self.cancel_btn = QPushButton("取消")
         self.cancel_btn.clicked.connect(self.cancel_processing)
         self.cancel_btn.setEnabled(False)
         action_layout.addWidget(self.preview_btn)
         action_layout.addWidget(self.execute_btn)
+        action_layout.addWidget(self.undo_btn)
         action_layout.addWidget(self.cancel_btn)
         self.layout.addLayout(action_layout)
         
@@ -139,54 +207,80 @@ class MainTab(QWidget):
 
     def browse_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "选择文件夹")
-        if folder:
-            video_files = []
-            for root, _, files in os.walk(folder):
-                for f in files:
-                    if os.path.splitext(f)[1].lower() in VIDEO_EXTENSIONS:
-                        video_files.append(os.path.join(root, f))
-            self.add_paths_to_list(video_files)
+        if folder: self.start_scan([folder])
+
+    def start_scan(self, folders):
+        """后台扫描文件夹，边扫边加入列表；扫描期间可用“取消”停止"""
+        if self.scan_worker and self.scan_worker.isRunning():
+            self.pending_scan.extend(folders)  # 当前扫描结束后接着扫描
+            return
+        skip_dirs = self.parent_window.settings_tab.get_config_data().get('scan_skip_dirs')
+        self.set_ui_enabled(False)
+        self.scan_label.setText("正在扫描...")
+        self.scan_worker = ScanWorker(list(folders), skip_dirs)
+        self.scan_worker.batch_signal.connect(self.append_paths)
+        self.scan_worker.count_signal.connect(lambda n: self.scan_label.setText(f"正在扫描... 已找到 {n} 个视频文件"))
+        self.scan_worker.finished_signal.connect(self.scan_finished)
+        self.scan_worker.start()
+
+    def scan_finished(self, found):
+        interrupted = self.scan_worker._is_interrupted
+        self.scan_label.setText(f"扫描{'已取消' if interrupted else '完成'}，共找到 {found} 个视频文件")
+        if not self.processing: self.set_ui_enabled(True)
+        pending, self.pending_scan = self.pending_scan, []
+        if pending and not interrupted: self.start_scan(pending)
+
+    @staticmethod
+    def normalize_path(p):
+        # 1. URL 解码
+        p = urllib.parse.unquote(p)
+
+        # 2. 智能剥离协议头并处理 UNC 路径
+        if p.startswith('file:///'):
+            # 本地路径格式 file:///D:/path
+            p = p[8:]
+        elif p.startswith('file://'):
+            # 网络 UNC 路径格式 file://192.168.1.1/share
+            # 剥离后需补回 // 以前缀表示这是网络路径
+            p = '//' + p[7:]
+
+        # 3. 针对 Windows 本地盘符的修正 (如 /D:/ -> D:/)
+        if os.name == 'nt' and len(p) > 2 and p[0] == '/' and p[2] == ':':
+            p = p[1:]
+
+        # 4. 标准化路径 (会自动将 // 转为 \\\\)
+        return os.path.normpath(p)
 
     def add_paths_to_list(self, paths):
-        current_text = self.file_list.toPlainText()
-        existing = set(current_text.splitlines())
-        
-        processed = []
+        """拖放/浏览得到的路径：文件直接加入，文件夹交给后台扫描；任务进行中则排队到结束后"""
+        if self.processing:
+            self.pending_paths.extend(paths)
+            self.log_buffer.push(f"[INFO] 任务进行中，拖入的 {len(paths)} 个路径将在结束后加入列表")
+            return
+        files, folders = [], []
         for p in paths:
-            # 1. URL 解码
-            p = urllib.parse.unquote(p)
-            
-            # 2. 智能剥离协议头并处理 UNC 路径
-            if p.startswith('file:///'): 
-                # 本地路径格式 file:///D:/path
-                p = p[8:]
-            elif p.startswith('file://'):
-                # 网络 UNC 路径格式 file://192.168.1.1/share
-                # 剥离后需补回 // 以前缀表示这是网络路径
-                p = '//' + p[7:]
-            
-            # 3. 针对 Windows 本地盘符的修正 (如 /D:/ -> D:/)
-            if os.name == 'nt' and len(p) > 2 and p[0] == '/' and p[2] == ':':
-                p = p[1:]
-            
-            # 4. 标准化路径 (会自动将 // 转为 \\\\)
-            p = os.path.normpath(p)
-            
-            if p not in existing:
-                processed.append(p)
-                existing.add(p)
-        if processed:
-            prefix = "\n" if current_text.strip() else ""
-            self.file_list.append(prefix + "\n".join(processed))
+            p = self.normalize_path(p)
+            (folders if os.path.isdir(p) else files).append(p)
+        self.append_paths(files)
+        if folders: self.start_scan(folders)
+
+    def append_paths(self, paths):
+        self.path_model.add_paths(paths)
+
+    def remove_selected_paths(self):
+        rows = [index.row() for index in self.file_list.selectionModel().selectedRows()]
+        self.path_model.remove_rows(rows)
 
     def clear_file_list(self):
-        self.file_list.clear()
-        self.preview_table.setRowCount(0)
+        self.path_model.clear()
+        self.audit.clear()
+        self.detail_output.clear()
+        self.last_plan = None
+        self.preview_model.clear()
         self.progress_bar.setValue(0)
 
     def start_processing(self, preview_only=False):
-        file_text = self.file_list.toPlainText()
-        file_paths = [p.strip() for p in file_text.splitlines() if p.strip()]
+        file_paths = self.path_model.paths()
         if not file_paths:
             QMessageBox.warning(self, "警告", "请先添加文件！")
             return
@@ -204,37 +298,96 @@ class MainTab(QWidget):
             'media_type_override': self.custom_tmdb_media_combo.currentText()
         }
 
-        self.preview_table.setRowCount(0)
+        # 文件列表与配置都未变化时，执行阶段直接套用上一次预览的计划
+        plan = None
+        if not preview_only and self.last_plan is not None and self.last_plan.matches(file_paths, config_data):
+            plan = self.last_plan
+        self.last_plan = None
+
+        self.preview_model.clear()
         self.progress_bar.setValue(0)
         self.set_ui_enabled(False)
+        self.processing = True
 
-        self.worker = RenameWorker(file_paths, config_data, preview_only)
-        self.worker.log_signal.connect(self.log_output.append)
+        if plan is None:
+            self.audit = AuditLog()
+        self.detail_output.clear()
+        self.worker = RenameWorker(file_paths, config_data, preview_only, plan=plan, audit=self.audit)
+        self.worker.log_signal.connect(self.log_buffer.push, Qt.ConnectionType.DirectConnection) # 线程安全缓冲，不逐行投递事件
         self.worker.progress_signal.connect(self.progress_bar.setValue)
-        self.worker.preview_signal.connect(self.update_preview_table)
+        self.worker.preview_signal.connect(self.preview_model.append_rows)
+        self.worker.groups_signal.connect(self.show_groups)
         self.worker.finished_signal.connect(self.processing_finished)
         self.worker.start()
 
-    def update_preview_table(self, old, new, main, season):
-        row = self.preview_table.rowCount()
-        self.preview_table.insertRow(row)
-        self.preview_table.setItem(row, 0, QTableWidgetItem(old))
-        self.preview_table.setItem(row, 1, QTableWidgetItem(new))
-        self.preview_table.setItem(row, 2, QTableWidgetItem(main))
-        self.preview_table.setItem(row, 3, QTableWidgetItem(season))
-        self.preview_table.scrollToBottom()
+    def flush_logs(self):
+        lines = self.log_buffer.drain(self.log_level_combo.currentData())
+        if lines:
+            self.log_output.appendPlainText("\n".join(lines))
+
+    def refilter_logs(self):
+        self.log_buffer.drain()
+        self.log_output.setPlainText("\n".join(self.log_buffer.lines(self.log_level_combo.currentData())))
+        self.log_output.verticalScrollBar().setValue(self.log_output.verticalScrollBar().maximum())
+
+    def show_file_detail(self, current, previous=None):
+        if not current.isValid(): return
+        path = self.preview_model.source_path(self.preview_proxy.mapToSource(current).row())
+        self.detail_output.setPlainText(self.audit.render(path) or "该文件没有识别日志")
+
+    def follow_preview_tail(self):
+        # 未排序时跟随最新结果滚动；用户按列排序后保持当前位置
+        if self.preview_proxy.sortColumn() < 0:
+            self.preview_table.scrollToBottom()
+
+    def show_groups(self, groups):
+        """云端阶段结束后展示按系列分组的解析结果"""
+        self.groups = groups
+        self.log_buffer.push(f"[INFO] 本批次共 {len(groups)} 个系列分组:")
+        for g in groups:
+            status = f"{g['title']} (TMDB {g['tmdb_id']})" if g['matched'] else "未匹配"
+            self.log_buffer.push(f"[INFO] [分组] {g['key']} × {g['count']} -> {status}")
 
     def set_ui_enabled(self, enabled):
         self.browse_files_btn.setEnabled(enabled)
         self.browse_folder_btn.setEnabled(enabled)
         self.preview_btn.setEnabled(enabled)
         self.execute_btn.setEnabled(enabled)
+        self.undo_btn.setEnabled(enabled)
         self.clear_btn.setEnabled(enabled)
         self.cancel_btn.setEnabled(not enabled)
 
+    def undo_last_run(self):
+        reply = QMessageBox.question(self, "撤销", "将按执行日志把最近一次重命名的文件移回原位置，是否继续？")
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        self.last_plan = None
+        self.progress_bar.setValue(0)
+        self.set_ui_enabled(False)
+        self.processing = True
+        self.worker = UndoWorker()
+        self.worker.log_signal.connect(self.log_buffer.push, Qt.ConnectionType.DirectConnection) # 线程安全缓冲，不逐行投递事件
+        self.worker.progress_signal.connect(self.progress_bar.setValue)
+        self.worker.finished_signal.connect(self.undo_finished)
+        self.worker.start()
+
+    def undo_finished(self, results):
+        self.task_finished()
+        QMessageBox.information(self, "完成", f"撤销结束！共还原 {len(results)} 个文件。")
+
     def cancel_processing(self):
-        if self.worker: self.worker.requestInterruption()
+        for worker in (self.scan_worker, self.worker):
+            if worker and worker.isRunning(): worker.requestInterruption()
+
+    def task_finished(self):
+        """预览/执行/撤销结束：恢复界面 (扫描仍在进行时由 scan_finished 恢复)，再处理排队的拖入路径"""
+        self.processing = False
+        if not (self.scan_worker and self.scan_worker.isRunning()): self.set_ui_enabled(True)
+        pending, self.pending_paths = self.pending_paths, []
+        if pending: self.add_paths_to_list(pending)
 
     def processing_finished(self, results):
-        self.set_ui_enabled(True)
+        self.task_finished()
+        if self.worker and self.worker.preview_only and not self.worker._is_interrupted:
+            self.last_plan = self.worker.plan
         QMessageBox.information(self, "完成", f"任务结束！共处理 {len(results)} 个文件。")
@@ -2,11 +2,19 @@ import os
 import sqlite3
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QGroupBox, QFormLayout, 
                              QLineEdit, QComboBox, QPlainTextEdit, QPushButton, 
-                             QLabel, QMessageBox, QHBoxLayout, QCheckBox, QScrollArea, QFrame)
+                             QLabel, QMessageBox, QHBoxLayout, QCheckBox, QScrollArea, QFrame,
+                             QSpinBox)
 from PyQt6.QtCore import Qt
 from src.utils.config import config
 from src.utils.downloader import DownloadWorker
 from src.utils.paths import APP_ROOT, CORE_ALGO_DIR, CORE_DB_PATH
+from src.core.kernel import kernel_registry
+from src.core.renamer import RenameEngine, ORGANIZE_MODES
+from src.core.regex_chain import RegexRuleChain
+from src.utils.result_cache import ResultCache
+from src.utils.scanner import parse_skip_dirs
+from src.utils.watcher import watch_dirs_from_text
+from src.core.settings import DEFAULTS, parse_regex_rules
 
 class SettingsTab(QWidget):
     def __init__(self, parent=None):
@@ -60,6 +68,22 @@ class SettingsTab(QWidget):
         
         self.movie_folder_input = QLineEdit()
         format_layout.addRow("电影文件夹格式:", self.movie_folder_input)
+
+        format_layout.addRow(QFrame()) # 分割线
+        self.organize_mode_combo = QComboBox()
+        for key, label in ORGANIZE_MODES.items():
+            self.organize_mode_combo.addItem(label, key)
+        self.organize_mode_combo.setToolTip("做种中的文件请选择链接方式，原文件保持不动；硬链接不能跨分区")
+        format_layout.addRow("整理方式:", self.organize_mode_combo)
+        self.scan_skip_dirs_input = QLineEdit()
+        self.scan_skip_dirs_input.setToolTip("扫描文件夹时不进入的目录名，用逗号分隔")
+        format_layout.addRow("扫描跳过目录:", self.scan_skip_dirs_input)
+        self.watch_dirs_input = QLineEdit()
+        self.watch_dirs_input.setToolTip("命令行监控模式 (python cli.py --watch) 监控的下载目录，多个用分号分隔")
+        format_layout.addRow("监控目录:", self.watch_dirs_input)
+        self.watch_stable_spin = QSpinBox(); self.watch_stable_spin.setRange(1, 3600)
+        self.watch_stable_spin.setToolTip("新文件的大小与修改时间保持不变多少秒后才视为下载完成")
+        format_layout.addRow("写入稳定等待(秒):", self.watch_stable_spin)
         
         format_group.setLayout(format_layout)
         self.layout.addWidget(format_group)
@@ -73,12 +97,24 @@ class SettingsTab(QWidget):
         self.tmdb_proxy_input = QLineEdit(); net_layout.addRow("TMDB 代理:", self.tmdb_proxy_input)
         self.bangumi_token_input = QLineEdit(); net_layout.addRow("Bangumi Token:", self.bangumi_token_input)
         self.bangumi_proxy_input = QLineEdit(); net_layout.addRow("Bangumi 代理:", self.bangumi_proxy_input)
+        self.cloud_base_url_input = QLineEdit(); self.cloud_base_url_input.setPlaceholderText("留空直连，例如 http://127.0.0.1:8765")
+        self.cloud_base_url_input.setToolTip("把 TMDB / Bangumi 请求全部转发到该地址 (本地替身服务器)，用于离线测试")
+        net_layout.addRow("云端替身地址:", self.cloud_base_url_input)
         self.use_storage_cb = QCheckBox("开启智能记忆"); self.use_storage_cb.setChecked(True)
         net_layout.addRow(self.use_storage_cb)
         strat_layout = QHBoxLayout()
         self.anime_priority_cb = QCheckBox("动漫优化"); self.bgm_failover_cb = QCheckBox("Bgm 故障转移")
         strat_layout.addWidget(self.anime_priority_cb); strat_layout.addWidget(self.bgm_failover_cb)
         net_layout.addRow("策略:", strat_layout)
+        self.max_concurrency_spin = QSpinBox(); self.max_concurrency_spin.setRange(1, 64)
+        self.max_concurrency_spin.setToolTip("同一批次内同时进行云端识别的文件数上限")
+        net_layout.addRow("并发识别数:", self.max_concurrency_spin)
+        self.l1_processes_spin = QSpinBox(); self.l1_processes_spin.setRange(0, 64)
+        self.l1_processes_spin.setToolTip("L1 本地识别使用的子进程数，0 表示在当前线程内识别")
+        net_layout.addRow("L1 识别进程数:", self.l1_processes_spin)
+        self.rename_workers_spin = QSpinBox(); self.rename_workers_spin.setRange(1, 64)
+        self.rename_workers_spin.setToolTip("执行重命名时按目标目录并行的线程数，网络共享上可适当调大")
+        net_layout.addRow("执行并行线程数:", self.rename_workers_spin)
         net_group.setLayout(net_layout)
         self.layout.addWidget(net_group)
 
@@ -87,7 +123,10 @@ class SettingsTab(QWidget):
         db_layout = QHBoxLayout()
         self.clear_cache_btn = QPushButton("清理元数据缓存"); self.clear_cache_btn.clicked.connect(lambda: self.clear_core_db_table("metadata_cache"))
         self.clear_memory_btn = QPushButton("清理识别指纹记忆"); self.clear_memory_btn.clicked.connect(lambda: self.clear_core_db_table("recognition_memory"))
+        self.clear_result_cache_btn = QPushButton("清理识别结果缓存"); self.clear_result_cache_btn.clicked.connect(self.clear_result_cache)
+        self.result_cache_cb = QCheckBox("启用识别结果缓存")
         db_layout.addWidget(self.clear_cache_btn); db_layout.addWidget(self.clear_memory_btn)
+        db_layout.addWidget(self.clear_result_cache_btn); db_layout.addWidget(self.result_cache_cb)
         db_group.setLayout(db_layout); self.layout.addWidget(db_group)
 
         # 4. 算法内核
@@ -97,7 +136,9 @@ class SettingsTab(QWidget):
         btn_h = QHBoxLayout()
         self.download_btn = QPushButton("下载/更新内核"); self.download_btn.clicked.connect(self.download_core_algorithm)
         self.help_btn = QPushButton("💡 占位符帮助文档"); self.help_btn.clicked.connect(self.show_placeholder_help)
-        btn_h.addWidget(self.download_btn); btn_h.addWidget(self.help_btn)
+        self.debug_mode_cb = QCheckBox("调试模式 (逐文件日志与完整 JSON 输出到日志区)")
+        self.trace_export_cb = QCheckBox("导出性能追踪 (data/traces)")
+        btn_h.addWidget(self.download_btn); btn_h.addWidget(self.help_btn); btn_h.addWidget(self.debug_mode_cb); btn_h.addWidget(self.trace_export_cb)
         algo_layout.addWidget(self.algo_status_label); algo_layout.addLayout(btn_h)
         algo_group.setLayout(algo_layout); self.layout.addWidget(algo_group)
 
@@ -134,7 +175,9 @@ class SettingsTab(QWidget):
 
     def on_download_finished(self, success, message):
         self.download_btn.setEnabled(True)
-        if success: self.check_algo_status()
+        if success:
+            kernel_registry.invalidate()
+            self.check_algo_status()
         QMessageBox.information(self, "结果", message)
 
     def show_placeholder_help(self):
@@ -155,27 +198,52 @@ class SettingsTab(QWidget):
                 QMessageBox.information(self, "成功", "清理完成。")
             except Exception as e: QMessageBox.warning(self, "错误", str(e))
 
+    def clear_result_cache(self):
+        if QMessageBox.question(self, '确认', "确定清理识别结果缓存？") == QMessageBox.StandardButton.Yes:
+            try:
+                cache = ResultCache(); cache.clear(); cache.close()
+                QMessageBox.information(self, "成功", "清理完成。")
+            except Exception as e: QMessageBox.warning(self, "错误", str(e))
+
     def load_settings(self):
         # 剧集
-        self.rename_format_combo.setCurrentText(config.get_value("rename_format", "S{season_02}E{episode_02} - {filename}"))
-        self.folder_format_input.setText(config.get_value("folder_format", "({year}){title}[tmdbid={tmdb_id}]"))
-        self.season_format_input.setText(config.get_value("season_format", "Season {season}"))
+        self.rename_format_combo.setCurrentText(config.get_value("rename_format", DEFAULTS["rename_format"]))
+        self.folder_format_input.setText(config.get_value("folder_format", DEFAULTS["folder_format"]))
+        self.season_format_input.setText(config.get_value("season_format", DEFAULTS["season_format"]))
         
         # 电影
-        self.movie_format_combo.setCurrentText(config.get_value("movie_format", "{title} ({year}) [{resolution}][{video_encode}]"))
-        self.movie_folder_input.setText(config.get_value("movie_folder_format", "({year}){title}[tmdbid={tmdb_id}]"))
+        self.movie_format_combo.setCurrentText(config.get_value("movie_format", DEFAULTS["movie_format"]))
+        self.movie_folder_input.setText(config.get_value("movie_folder_format", DEFAULTS["movie_folder_format"]))
         
-        self.regex_rules_edit.setPlainText(config.get_value("regex_rules", ""))
-        self.with_cloud_cb.setChecked(config.get_value("with_cloud", True, type=bool))
-        self.tmdb_api_key_input.setText(config.get_value("tmdb_api_key", ""))
-        self.tmdb_proxy_input.setText(config.get_value("tmdb_proxy", ""))
-        self.bangumi_token_input.setText(config.get_value("bangumi_token", ""))
-        self.bangumi_proxy_input.setText(config.get_value("bangumi_proxy", ""))
-        self.use_storage_cb.setChecked(config.get_value("use_storage", True, type=bool))
-        self.anime_priority_cb.setChecked(config.get_value("anime_priority", True, type=bool))
-        self.bgm_failover_cb.setChecked(config.get_value("bgm_failover", True, type=bool))
+        self.organize_mode_combo.setCurrentIndex(max(0, self.organize_mode_combo.findData(config.get_value("organize_mode", DEFAULTS["organize_mode"]))))
+        self.scan_skip_dirs_input.setText(config.get_value("scan_skip_dirs", DEFAULTS["scan_skip_dirs"]))
+        self.watch_dirs_input.setText(config.get_value("watch_dirs", DEFAULTS["watch_dirs"]))
+        self.watch_stable_spin.setValue(config.get_value("watch_stable_seconds", DEFAULTS["watch_stable_seconds"], type=int))
+        self.regex_rules_edit.setPlainText(config.get_value("regex_rules", DEFAULTS["regex_rules"]))
+        self.with_cloud_cb.setChecked(config.get_value("with_cloud", DEFAULTS["with_cloud"], type=bool))
+        self.tmdb_api_key_input.setText(config.get_value("tmdb_api_key", DEFAULTS["tmdb_api_key"]))
+        self.tmdb_proxy_input.setText(config.get_value("tmdb_proxy", DEFAULTS["tmdb_proxy"]))
+        self.bangumi_token_input.setText(config.get_value("bangumi_token", DEFAULTS["bangumi_token"]))
+        self.bangumi_proxy_input.setText(config.get_value("bangumi_proxy", DEFAULTS["bangumi_proxy"]))
+        self.cloud_base_url_input.setText(config.get_value("cloud_base_url", DEFAULTS["cloud_base_url"]))
+        self.use_storage_cb.setChecked(config.get_value("use_storage", DEFAULTS["use_storage"], type=bool))
+        self.anime_priority_cb.setChecked(config.get_value("anime_priority", DEFAULTS["anime_priority"], type=bool))
+        self.bgm_failover_cb.setChecked(config.get_value("bgm_failover", DEFAULTS["bgm_failover"], type=bool))
+        self.max_concurrency_spin.setValue(config.get_value("max_concurrency", DEFAULTS["max_concurrency"], type=int))
+        self.l1_processes_spin.setValue(config.get_value("l1_processes", DEFAULTS["l1_processes"], type=int))
+        self.rename_workers_spin.setValue(config.get_value("rename_workers", DEFAULTS["rename_workers"], type=int))
+        self.result_cache_cb.setChecked(config.get_value("result_cache", DEFAULTS["result_cache"], type=bool))
+        self.debug_mode_cb.setChecked(config.get_value("debug_mode", DEFAULTS["debug_mode"], type=bool))
+        self.trace_export_cb.setChecked(config.get_value("trace_export", DEFAULTS["trace_export"], type=bool))
 
     def save_settings(self):
+        errors = RenameEngine.validate_formats(
+            self.rename_format_combo.currentText(), self.folder_format_input.text(), self.season_format_input.text(),
+            self.movie_format_combo.currentText(), self.movie_folder_input.text()
+        )
+        if errors:
+            QMessageBox.warning(self, "格式错误", "以下格式串无法保存：\n" + "\n".join(errors) + "\n\n可用占位符见 README.md。")
+            return
         config.set_value("rename_format", self.rename_format_combo.currentText())
         config.set_value("folder_format", self.folder_format_input.text())
         config.set_value("season_format", self.season_format_input.text())
@@ -183,15 +251,30 @@ class SettingsTab(QWidget):
         config.set_value("movie_format", self.movie_format_combo.currentText())
         config.set_value("movie_folder_format", self.movie_folder_input.text())
         
+        config.set_value("organize_mode", self.organize_mode_combo.currentData())
+        config.set_value("scan_skip_dirs", self.scan_skip_dirs_input.text())
+        config.set_value("watch_dirs", self.watch_dirs_input.text().strip())
+        config.set_value("watch_stable_seconds", self.watch_stable_spin.value())
         config.set_value("regex_rules", self.regex_rules_edit.toPlainText())
         config.set_value("with_cloud", self.with_cloud_cb.isChecked())
         config.set_value("tmdb_api_key", self.tmdb_api_key_input.text().strip())
         config.set_value("tmdb_proxy", self.tmdb_proxy_input.text().strip())
         config.set_value("bangumi_token", self.bangumi_token_input.text().strip())
         config.set_value("bangumi_proxy", self.bangumi_proxy_input.text().strip())
+        config.set_value("cloud_base_url", self.cloud_base_url_input.text().strip())
         config.set_value("use_storage", self.use_storage_cb.isChecked())
         config.set_value("anime_priority", self.anime_priority_cb.isChecked())
         config.set_value("bgm_failover", self.bgm_failover_cb.isChecked())
+        config.set_value("max_concurrency", self.max_concurrency_spin.value())
+        config.set_value("l1_processes", self.l1_processes_spin.value())
+        config.set_value("rename_workers", self.rename_workers_spin.value())
+        config.set_value("result_cache", self.result_cache_cb.isChecked())
+        config.set_value("debug_mode", self.debug_mode_cb.isChecked())
+        config.set_value("trace_export", self.trace_export_cb.isChecked())
+        regex_errors = RegexRuleChain(self.parse_regex_rules()).errors
+        if regex_errors:
+            QMessageBox.warning(self, "噪声清洗规则", "设置已保存，但以下规则无效，将在重命名时被跳过：\n" + "\n".join(regex_errors))
+            return
         QMessageBox.information(self, "成功", "设置已保存。")
 
     def get_config_data(self):
@@ -201,20 +284,27 @@ class SettingsTab(QWidget):
             'season_format': self.season_format_input.text(),
             'movie_format': self.movie_format_combo.currentText(),
             'movie_folder_format': self.movie_folder_input.text(),
+            'organize_mode': self.organize_mode_combo.currentData(),
+            'scan_skip_dirs': parse_skip_dirs(self.scan_skip_dirs_input.text()),
+            'watch_dirs': watch_dirs_from_text(self.watch_dirs_input.text()),
+            'watch_stable_seconds': self.watch_stable_spin.value(),
             'regex_rules': self.parse_regex_rules(),
             'with_cloud': self.with_cloud_cb.isChecked(),
             'tmdb_api_key': self.tmdb_api_key_input.text().strip(),
             'tmdb_proxy': self.tmdb_proxy_input.text().strip(),
             'bangumi_token': self.bangumi_token_input.text().strip(),
             'bangumi_proxy': self.bangumi_proxy_input.text().strip(),
+            'cloud_base_url': self.cloud_base_url_input.text().strip(),
             'use_storage': self.use_storage_cb.isChecked(),
             'anime_priority': self.anime_priority_cb.isChecked(),
-            'bgm_failover': self.bgm_failover_cb.isChecked()
+            'bgm_failover': self.bgm_failover_cb.isChecked(),
+            'max_concurrency': self.max_concurrency_spin.value(),
+            'l1_processes': self.l1_processes_spin.value(),
+            'rename_workers': self.rename_workers_spin.value(),
+            'result_cache': self.result_cache_cb.isChecked(),
+            'debug_mode': self.debug_mode_cb.isChecked(),
+            'trace_export': self.trace_export_cb.isChecked()
         }
 
     def parse_regex_rules(self):
-        rules = []
-        for line in self.regex_rules_edit.toPlainText().splitlines():
-            if '=>' in line:
-                p, r = line.split('=>', 1); rules.append((p.strip(), r.strip()))
-        return rules
+        return parse_regex_rules(self.regex_rules_edit.toPlainText())
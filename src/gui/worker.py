@@ -1,22 +1,46 @@
 import os
+import time
+import asyncio
 import traceback
+import threading
 from PyQt6.QtCore import QThread, pyqtSignal
 from src.core.processor import RecognitionProcessor
+from src.core.planner import BatchPlanner
 from src.core.renamer import RenameEngine
+from src.core.template import TemplateError
+from src.core.plan import RenamePlan, STATUS_READY, STATUS_CONFLICT, STATUS_FAILED
+from src.core.executor import BatchExecutor
+from src.utils.result_cache import ResultCache
+from src.utils.scanner import scan_videos, DEFAULT_SKIP_DIRS
+from src.utils.logbuffer import AuditLog
 
 class RenameWorker(QThread):
+    # 预览行在工作线程内攒批：满 PREVIEW_CHUNK 行或距上次发送超过 PREVIEW_FLUSH_SECONDS 才跨线程投递一次
+    PREVIEW_CHUNK = 1000
+    PREVIEW_FLUSH_SECONDS = 0.05
     progress_signal = pyqtSignal(int)
     log_signal = pyqtSignal(str)
-    preview_signal = pyqtSignal(str, str, str, str)
+    preview_signal = pyqtSignal(list)  # 成批的 (原路径, 新文件名, 主文件夹, 季文件夹, 状态, 状态文字)
+    groups_signal = pyqtSignal(list)
     finished_signal = pyqtSignal(list)
 
-    def __init__(self, file_paths, config_data, preview_only=False):
+    def __init__(self, file_paths, config_data, preview_only=False, plan=None, audit=None):
+        """
+        plan: 预览阶段产出的 RenamePlan；执行时传入则直接套用，不再重新识别。
+        audit: 逐文件详细日志的存放处 (AuditLog)，不再逐行推送到界面。
+        """
         super().__init__()
         self.file_paths = file_paths
         self.config_data = config_data
         self.preview_only = preview_only
+        self.plan = plan
+        self.audit = audit if audit is not None else AuditLog()
         self._is_interrupted = False
         self.results = []
+        self._preview_rows = []
+        self._preview_sent = 0.0
+        self._preview_timer = None
+        self._progress = -1
 
     def requestInterruption(self):
         self._is_interrupted = True
@@ -28,45 +52,250 @@ class RenameWorker(QThread):
             self.finished_signal.emit([])
             return
 
+        try:
+            renamer = RenameEngine.from_config(self.config_data)
+        except TemplateError as e:
+            self.log_signal.emit(f"[ERROR] 重命名格式无效: {str(e)}")
+            self.finished_signal.emit([])
+            return
+        for err in renamer.regex_chain.errors:
+            self.log_signal.emit(f"[WARN] 噪声清洗{err}，已跳过")
+
+        if self.plan is not None and not self.preview_only:
+            self._apply_plan(renamer)
+            self.finished_signal.emit(self.results)
+            return
+
+        self.plan = RenamePlan(self.config_data)
         processor = RecognitionProcessor(self.config_data)
-        renamer = RenameEngine(
-            rename_format=self.config_data.get('rename_format'),
-            movie_format=self.config_data.get('movie_format'),
-            folder_format=self.config_data.get('folder_format'),
-            movie_folder_format=self.config_data.get('movie_folder_format'),
-            season_format=self.config_data.get('season_format'),
-            regex_rules=self.config_data.get('regex_rules', [])
+        for log in processor.prepare():
+            self.log_signal.emit(log)
+
+        # 整个批次共用一个事件循环，由 BatchPlanner 在其中并发驱动云端请求
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self._run_batch(processor, renamer, total_files))
+        except Exception as e:
+            self.log_signal.emit(f"[CRITICAL] 批处理异常: {str(e)}\n{traceback.format_exc()}")
+        finally:
+            loop.run_until_complete(processor.aclose())
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+        # 整批目标路径规划完毕、冲突已标记后才开始动文件
+        if not self.preview_only and not self._is_interrupted:
+            self._apply_plan(renamer, emit_preview=False)
+        self.finished_signal.emit(self.results)
+
+    async def _run_batch(self, processor, renamer, total_files):
+        # 进度条：前一半为整批 L1，后一半为逐文件合成与路径规划
+        i = 0
+        debug = self.config_data.get('debug_mode', False)
+        cache = ResultCache() if self.config_data.get('result_cache', True) else None
+        planner = BatchPlanner(processor)
+        batch = planner.iter_recognize(
+            self.file_paths,
+            concurrency=self.config_data.get('max_concurrency'),
+            should_stop=lambda: self._is_interrupted,
+            on_local_progress=lambda done, total: self._report_progress(int(done / total * 50)),
+            cache=cache,
+            on_groups=self.groups_signal.emit
         )
+        try:
+            async for video_path, rec_result in batch:
+                if self._is_interrupted: break
+                try:
+                    self.log_signal.emit(f"[DEBUG] 正在分析: {os.path.basename(video_path)}")
+                    self.audit.put(video_path, rec_result.to_dict(), rec_result.logs)
+                    if debug:
+                        for log in rec_result.logs:
+                            self.log_signal.emit(f"[DEBUG] {log}")
+
+                    with processor.tracer.span("rename.build_paths", video_path):
+                        item = renamer.plan_file(self.plan, video_path, rec_result, self.config_data.get('custom_settings'))
+                    self._emit_item(item)
+                    if item.status in (STATUS_CONFLICT, STATUS_FAILED):
+                        self.log_signal.emit(f"[WARN] {os.path.basename(video_path)}: {item.label}")
+                    if self.preview_only:
+                        self.results.append((video_path, item.target))
+
+                except Exception as e:
+                    self.log_signal.emit(f"[CRITICAL] 处理中断: {str(e)}\n{traceback.format_exc()}")
+
+                i += 1
+                self._report_progress(50 + int(i / total_files * 50))
+        finally:
+            self._flush_preview()
+            await batch.aclose()
+            if cache:
+                self.log_signal.emit(f"[INFO] 识别结果缓存: 命中 {cache.hits} / 未命中 {cache.misses}")
+                cache.close()
+            conflicts = self.plan.conflicts()
+            if conflicts:
+                self.log_signal.emit(f"[WARN] 共 {len(conflicts)} 个文件存在目标冲突，执行时将跳过")
+            self._report_trace(processor.tracer)
 
-        for i, video_path in enumerate(self.file_paths):
-            if self._is_interrupted: break
+    def _report_trace(self, tracer):
+        """输出本批次各阶段耗时汇总，按配置导出 Chrome trace"""
+        if not tracer.spans: return
+        self.log_signal.emit("[INFO] [性能] 本批次各阶段耗时:")
+        for line in tracer.summary_lines():
+            self.log_signal.emit(f"[INFO] [性能] {line}")
+        if self.config_data.get('trace_export'):
             try:
-                self.log_signal.emit(f"[INFO] 正在分析: {os.path.basename(video_path)}")
-                rec_result = processor.recognize_file(video_path)
-                for log in rec_result.logs:
-                    self.log_signal.emit(log)
-
-                new_full_path, main_folder, season_folder = renamer.build_paths(
-                    video_path, rec_result, self.config_data.get('custom_settings')
-                )
-                
-                new_filename = os.path.basename(new_full_path)
-                self.preview_signal.emit(os.path.basename(video_path), new_filename, main_folder, season_folder)
-
-                if not self.preview_only:
-                    success, msg = renamer.execute_rename(video_path, new_full_path)
-                    if success:
-                        self.log_signal.emit(f"[SUCCESS] {os.path.basename(video_path)} -> {new_filename}")
-                        self.results.append((video_path, new_full_path))
-                    else:
-                        self.log_signal.emit(f"[ERROR] {os.path.basename(video_path)}: {msg}")
-                else:
-                    self.results.append((video_path, new_full_path))
-
-                progress = int((i + 1) / total_files * 100)
-                self.progress_signal.emit(progress)
-
-            except Exception as e:
-                self.log_signal.emit(f"[CRITICAL] 处理中断: {str(e)}\n{traceback.format_exc()}")
+                self.log_signal.emit(f"[INFO] 性能追踪已导出: {tracer.export_chrome()} (可在 chrome://tracing 或 Perfetto 中打开)")
+            except OSError as e:
+                self.log_signal.emit(f"[ERROR] 性能追踪导出失败: {str(e)}")
 
-        self.finished_signal.emit(self.results)
+    def _report_progress(self, value):
+        """只在百分比变化时发信号，逐文件的进度不产生跨线程事件"""
+        if value != self._progress:
+            self._progress = value
+            self.progress_signal.emit(value)
+
+    def _emit_item(self, item):
+        self._preview_rows.append((item.source, os.path.basename(item.target),
+                                   item.main_folder, item.season_folder, item.status, item.label))
+        if len(self._preview_rows) >= self.PREVIEW_CHUNK or time.monotonic() - self._preview_sent >= self.PREVIEW_FLUSH_SECONDS:
+            self._flush_preview()
+        elif self._preview_timer is None:
+            # 批处理事件循环中：下一行迟迟不来 (如等待云端) 时，由定时器把已攒下的行送出
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            self._preview_timer = loop.call_later(self.PREVIEW_FLUSH_SECONDS, self._flush_preview)
+
+    def _flush_preview(self):
+        if self._preview_timer is not None:
+            self._preview_timer.cancel()
+            self._preview_timer = None
+        if self._preview_rows:
+            self.preview_signal.emit(self._preview_rows)
+            self._preview_rows = []
+        self._preview_sent = time.monotonic()
+
+    def _apply_plan(self, renamer, emit_preview=True):
+        """
+        直接套用计划：只校验源文件自预览以来未变化，不再识别与联网；冲突与失败条目跳过。
+        可执行的条目先写入执行日志，再由 BatchExecutor 按目标目录并行执行。
+        """
+        self.log_signal.emit(f"[INFO] 套用重命名计划，共 {len(self.plan)} 个文件")
+        pairs = []
+        for item in self.plan.items:
+            name = os.path.basename(item.source)
+            if emit_preview:
+                self._emit_item(item)
+            if item.status != STATUS_READY:
+                self.log_signal.emit(f"[INFO] {name}: {item.label}，已跳过")
+            elif item.is_stale():
+                self.log_signal.emit(f"[ERROR] {name}: 源文件在预览后已变化，已跳过 (请重新预览)")
+            else:
+                pairs.append((item.source, item.target))
+        self._flush_preview()
+        if not pairs:
+            self.progress_signal.emit(100)
+            return
+
+        # 进度按文件计数，跨设备拷贝中的文件按已拷贝字节折算；只在百分比变化时发信号
+        lock = threading.Lock()
+        total, done, last, inflight = len(pairs), [0], [-1], {}
+
+        def report():
+            value = int((done[0] + sum(inflight.values())) / total * 100)
+            if value != last[0]:
+                last[0] = value
+                self.progress_signal.emit(value)
+
+        def on_bytes(old_path, copied, size):
+            with lock:
+                inflight[old_path] = copied / size if size else 1
+                report()
+            return not self._is_interrupted
+
+        def on_result(old_path, new_path, ok, msg):
+            with lock:
+                inflight.pop(old_path, None)
+                done[0] += 1
+                report()
+            if ok:
+                self.log_signal.emit(f"[SUCCESS] {os.path.basename(old_path)} -> {os.path.basename(new_path)} ({msg})")
+            else:
+                self.log_signal.emit(f"[ERROR] {os.path.basename(old_path)}: {msg}")
+
+        mode = self.config_data.get('organize_mode', 'move')
+
+        def move(old_path, new_path):
+            return renamer.execute_rename(old_path, new_path, make_dirs=False, mode=mode,
+                                          progress=lambda copied, size: on_bytes(old_path, copied, size))
+
+        executor = BatchExecutor(self.config_data.get('rename_workers', 8))
+        journal, results = executor.execute(
+            pairs, move, on_result=on_result, should_stop=lambda: self._is_interrupted, mode=mode
+        )
+        self.results.extend((old, new) for old, new, ok, _ in results if ok)
+        self.log_signal.emit(f"[INFO] 执行日志已保存: {journal.path}")
+
+class UndoWorker(QThread):
+    """按执行日志撤销最近一次重命名；启动时先核对上次崩溃遗留的日志"""
+    progress_signal = pyqtSignal(int)
+    log_signal = pyqtSignal(str)
+    finished_signal = pyqtSignal(list)
+
+    def run(self):
+        executor = BatchExecutor()
+        for journal, fixed in executor.recover():
+            self.log_signal.emit(f"[WARN] 发现未正常结束的执行日志 {os.path.basename(journal.path)}，已按磁盘状态补记 {fixed} 个已完成操作")
+        journal = executor.last_undoable()
+        if journal is None:
+            self.log_signal.emit("[INFO] 没有可撤销的执行记录")
+            self.finished_signal.emit([])
+            return
+
+        lock = threading.Lock()
+        total, done = len(journal.undoable), [0]
+
+        def on_result(old_path, new_path, ok, msg):
+            with lock:
+                done[0] += 1
+                self.progress_signal.emit(int(done[0] / total * 100))
+            if ok:
+                self.log_signal.emit(f"[SUCCESS] 已还原 {os.path.basename(old_path)} -> {os.path.basename(new_path)}")
+            else:
+                self.log_signal.emit(f"[ERROR] 还原失败 {os.path.basename(old_path)}: {msg}")
+
+        self.log_signal.emit(f"[INFO] 撤销 {os.path.basename(journal.path)}，共 {total} 个文件")
+        try:
+            if journal.mode == "move":
+                revert = lambda old, new: RenameEngine.execute_rename(old, new, make_dirs=False)
+            else:
+                revert = RenameEngine.remove_link
+            results = executor.undo(journal, revert, on_result)
+        except Exception as e:
+            self.log_signal.emit(f"[CRITICAL] 撤销异常: {str(e)}\n{traceback.format_exc()}")
+            results = []
+        self.finished_signal.emit([(old, new) for old, new, ok, _ in results if ok])
+
+class ScanWorker(QThread):
+    """后台流式扫描文件夹，逐批把找到的视频路径交给界面"""
+    batch_signal = pyqtSignal(list)
+    count_signal = pyqtSignal(int)
+    finished_signal = pyqtSignal(int)
+
+    def __init__(self, roots, skip_dirs=None):
+        super().__init__()
+        self.roots = roots
+        self.skip_dirs = DEFAULT_SKIP_DIRS if skip_dirs is None else skip_dirs
+        self._is_interrupted = False
+
+    def requestInterruption(self):
+        self._is_interrupted = True
+
+    def run(self):
+        found = 0
+        for batch in scan_videos(self.roots, skip_dirs=self.skip_dirs, should_stop=lambda: self._is_interrupted):
+            found += len(batch)
+            self.batch_signal.emit(batch)
+            self.count_signal.emit(found)
+        self.finished_signal.emit(found)
@@ -1,6 +1,7 @@
 import os
 import datetime
 from peewee import *
+from peewee import chunked
 from src.utils.paths import DB_PATH
 
 # 确保使用的是绝对路径
@@ -28,10 +29,47 @@ class SubscriptionCache(BaseModel):
     content = TextField(default="")
     updated_at = DateTimeField(default=datetime.datetime.now)
 
+class RuleLine(BaseModel):
+    """规则逐行展开后的索引表：source 为 'local' 或 'sub:<订阅ID>'，在保存/同步时写入"""
+    category = CharField()
+    source = CharField()
+    line = TextField()
+
+    class Meta:
+        indexes = (
+            (('category', 'line'), False),
+            (('category', 'source'), False),
+        )
+
+def _parse_rule_lines(content):
+    return sorted({line.strip() for line in (content or "").splitlines() if line.strip()})
+
+def replace_rule_lines(category, source, content):
+    """用 content 的解析结果整体替换某个来源的规则行"""
+    rows = [{'category': category, 'source': source, 'line': line} for line in _parse_rule_lines(content)]
+    with db.atomic():
+        RuleLine.delete().where(RuleLine.category == category, RuleLine.source == source).execute()
+        for batch in chunked(rows, 300):
+            RuleLine.insert_many(batch).execute()
+
+def rebuild_rule_lines(category):
+    """按本地规则与已启用订阅的缓存重建某个分类的全部规则行 (会清掉已删除订阅的残留)"""
+    with db.atomic():
+        RuleLine.delete().where(RuleLine.category == category).execute()
+        local_rule = LocalRule.get_or_none(category=category, enabled=True)
+        if local_rule:
+            replace_rule_lines(category, 'local', local_rule.content)
+        caches = (SubscriptionCache
+                  .select(SubscriptionCache, RemoteSubscription)
+                  .join(RemoteSubscription)
+                  .where(RemoteSubscription.category == category, RemoteSubscription.enabled == True))
+        for cache in caches:
+            replace_rule_lines(category, f"sub:{cache.subscription.id}", cache.content)
+
 def init_db():
     try:
         db.connect(reuse_if_open=True)
-        db.create_tables([LocalRule, RemoteSubscription, SubscriptionCache])
+        db.create_tables([LocalRule, RemoteSubscription, SubscriptionCache, RuleLine])
         
         # --- 自动迁移逻辑：检查并补全缺失的列 ---
         existing_columns = [c.name for c in db.get_columns('localrule')]
@@ -44,6 +82,15 @@ def init_db():
             db.execute_sql('ALTER TABLE subscriptioncache ADD COLUMN updated_at DATETIME')
             print("[DEBUG] 自动迁移：已补全 subscriptioncache.updated_at 列")
 
+        # 旧库首次升级：从原始文本回填规则行索引
+        if not RuleLine.select().exists():
+            categories = {r.category for r in LocalRule.select(LocalRule.category)}
+            categories |= {s.category for s in RemoteSubscription.select(RemoteSubscription.category)}
+            for category in categories:
+                rebuild_rule_lines(category)
+            if categories:
+                print(f"[DEBUG] 自动迁移：已回填 {len(categories)} 个分类的规则行索引")
+
         print(f"[DEBUG] 数据库初始化成功: {os.path.abspath(DB_PATH)}")
     except Exception as e:
         print(f"[ERROR] 数据库初始化或迁移失败: {e}")
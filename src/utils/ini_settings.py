@@ -0,0 +1,109 @@
+import os
+import re
+from src.utils.paths import CONFIG_INI
+
+_PERCENT = re.compile(r"%U([0-9A-Fa-f]{4})|%([0-9A-Fa-f]{2})")
+_ESCAPES = {"a": "\a", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t", "v": "\v",
+            "'": "'", '"': '"', "?": "?", "\\": "\\", ";": ";", ",": ",", "\n": ""}
+_HEX = "0123456789abcdefABCDEF"
+
+def _unescape_key(key):
+    key = _PERCENT.sub(lambda m: chr(int(m.group(1) or m.group(2), 16)), key.strip())
+    return key.replace("\\", "/")
+
+def _unescape_value(text):
+    """
+    按 QSettings IniFormat 的规则还原取值：双引号包裹、反斜杠转义 (含 \\xHHHH 与八进制)，
+    引号外的逗号分隔为列表、分号起始注释。返回 str 或 list。
+    """
+    parts, buf, quoted, has_quotes, i, n = [], [], False, False, 0, len(text)
+    while i < n:
+        ch = text[i]
+        if ch == '"':
+            quoted, has_quotes = not quoted, True
+        elif ch == "\\" and i + 1 < n:
+            i += 1
+            esc = text[i]
+            if esc == "x":
+                j = i + 1
+                while j < n and j - i <= 4 and text[j] in _HEX:
+                    j += 1
+                buf.append(chr(int(text[i + 1:j] or "0", 16)))
+                i = j - 1
+            elif esc in "01234567":
+                j = i
+                while j < n and j - i < 3 and text[j] in "01234567":
+                    j += 1
+                buf.append(chr(int(text[i:j], 8)))
+                i = j - 1
+            else:
+                buf.append(_ESCAPES.get(esc, esc))
+        elif not quoted and ch in ",;":
+            parts.append("".join(buf) if has_quotes else "".join(buf).strip())
+            buf, has_quotes = [], False
+            if ch == ";":
+                buf = None
+                break
+        else:
+            buf.append(ch)
+        i += 1
+    if buf is not None:
+        parts.append("".join(buf) if has_quotes else "".join(buf).strip())
+    return parts[0] if len(parts) == 1 else parts
+
+def _decode_variant(value):
+    if not isinstance(value, str) or not value.startswith("@"):
+        return value
+    for prefix in ("@String(", "@ByteArray("):
+        if value.startswith(prefix) and value.endswith(")"):
+            return value[len(prefix):-1]
+    if value.startswith("@@"):
+        return value[1:]
+    return None  # @Invalid() / @Variant(...) 等二进制取值无法在 Qt 外还原
+
+class IniSettings:
+    """
+    只读的 QSettings INI 读取器，不依赖 Qt。
+    接口与 ConfigManager.get_value 一致，供命令行等无界面环境读取同一份用户配置。
+    """
+    def __init__(self, path=CONFIG_INI):
+        self.config_path = path
+        self.values = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                self._parse(f.read())
+
+    def _parse(self, text):
+        section = ""
+        lines = iter(text.splitlines())
+        for line in lines:
+            while line.endswith("\\") and not line.endswith("\\\\"):  # 续行
+                line = line[:-1] + next(lines, "")
+            stripped = line.strip()
+            if not stripped or stripped[0] in ";#":
+                continue
+            if stripped.startswith("[") and stripped.endswith("]"):
+                section = _unescape_key(stripped[1:-1])
+                section = "" if section.lower() == "general" else section + "/"
+                continue
+            if "=" not in stripped:
+                continue
+            key, value = stripped.split("=", 1)
+            self.values[section + _unescape_key(key)] = _decode_variant(_unescape_value(value))
+
+    def get_value(self, key, default=None, type=None):
+        value = self.values.get(key)
+        if value is None:
+            return default
+        if type is bool:
+            if isinstance(value, str):
+                return value.strip().lower() in ("true", "1", "yes", "on")
+            return bool(value)
+        if type is int:
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return default
+        if type is str and isinstance(value, list):
+            return ", ".join(value)
+        return value
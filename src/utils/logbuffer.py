@@ -0,0 +1,77 @@
+import re
+import json
+import zlib
+import threading
+from collections import deque
+
+LOG_LEVELS = {"DEBUG": 10, "INFO": 20, "SUCCESS": 25, "WARN": 30, "ERROR": 40, "CRITICAL": 50}
+_LEVEL_RE = re.compile(r'^\[([A-Z]+)\]')
+
+def log_level(line):
+    """按行首的 [LEVEL] 前缀判断级别，没有前缀的按 INFO 处理"""
+    m = _LEVEL_RE.match(line)
+    return LOG_LEVELS.get(m.group(1), LOG_LEVELS["INFO"]) if m else LOG_LEVELS["INFO"]
+
+class LogBuffer:
+    """
+    带级别的环形日志缓冲 (线程安全)。
+    push 只做一次追加，界面定时调用 drain 取走新增行后一次性渲染；
+    records 保留最近 capacity 行，切换过滤级别时据此重绘。
+    """
+    def __init__(self, capacity=5000):
+        self.records = deque(maxlen=capacity)
+        self._pending = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def push(self, line):
+        record = (log_level(line), line)
+        with self._lock:
+            self.records.append(record)
+            self._pending.append(record)
+
+    def drain(self, min_level=0):
+        with self._lock:
+            pending, self._pending = list(self._pending), deque(maxlen=self._pending.maxlen)
+        return [line for level, line in pending if level >= min_level]
+
+    def lines(self, min_level=0):
+        with self._lock:
+            return [line for level, line in self.records if level >= min_level]
+
+    def clear(self):
+        with self._lock:
+            self.records.clear()
+            self._pending.clear()
+
+class AuditLog:
+    """
+    逐文件的详细识别日志，以压缩形式保存 (路径 -> zlib(JSON))，
+    只有在界面上选中该文件时才解压并渲染。
+    """
+    def __init__(self):
+        self._entries = {}
+
+    def put(self, path, data, logs):
+        payload = json.dumps([data, logs], ensure_ascii=False, separators=(',', ':'))
+        self._entries[path] = zlib.compress(payload.encode())
+
+    def get(self, path):
+        """返回 (data, logs)，没有记录时返回 None"""
+        blob = self._entries.get(path)
+        if blob is None:
+            return None
+        data, logs = json.loads(zlib.decompress(blob).decode())
+        return data, logs
+
+    def render(self, path):
+        entry = self.get(path)
+        if entry is None:
+            return ""
+        data, logs = entry
+        return "\n".join(logs + ["", json.dumps(data, ensure_ascii=False, indent=4)])
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
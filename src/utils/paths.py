@@ -2,7 +2,10 @@ import os
 import sys
 
 def get_app_root():
-    """获取程序运行的根目录 (EXE 所在目录或 main.py 所在目录)"""
+    """获取程序运行的根目录 (EXE 所在目录或 main.py 所在目录)；可用环境变量 VIDEO_RENAMER_ROOT 指定"""
+    if os.environ.get("VIDEO_RENAMER_ROOT"):
+        # 基准测试等从子目录启动的入口
+        return os.path.normpath(os.path.abspath(os.environ["VIDEO_RENAMER_ROOT"]))
     if getattr(sys, 'frozen', False):
         # 打包后的 EXE 环境
         path = os.path.dirname(os.path.abspath(sys.executable))
@@ -29,3 +32,6 @@ CONFIG_INI = os.path.join(APP_ROOT, "VideoRenamer_Qt6.ini")
 DB_PATH = os.path.join(APP_ROOT, "VideoRenamer.db")
 CORE_ALGO_DIR = os.path.join(APP_ROOT, "anime-matcher-main")
 CORE_DB_PATH = os.path.join(DATA_DIR, "matcher_storage.db")
+RESULT_CACHE_PATH = os.path.join(DATA_DIR, "recognition_cache.db")
+JOURNAL_DIR = os.path.join(DATA_DIR, "journal")
+TRACE_DIR = os.path.join(DATA_DIR, "traces")
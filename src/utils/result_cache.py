@@ -0,0 +1,95 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+from src.utils.paths import RESULT_CACHE_PATH
+
+# 影响识别结果的配置项；重命名格式等只作用于路径生成的配置不参与缓存键
+RELEVANT_CONFIG_KEYS = ('with_cloud', 'use_storage', 'anime_priority', 'bgm_failover',
+                        'batch_enhancement', 'custom_words', 'custom_groups')
+RELEVANT_CUSTOM_KEYS = ('tmdb_id_override', 'media_type_override')
+
+def context_key(config, rules_digest, kernel_version):
+    """批次级上下文指纹：规则快照、内核版本与相关配置字段"""
+    custom = config.get('custom_settings') or {}
+    payload = {
+        "rules": rules_digest,
+        "kernel": kernel_version,
+        "config": {k: config.get(k) for k in RELEVANT_CONFIG_KEYS},
+        "custom": {k: custom.get(k) for k in RELEVANT_CUSTOM_KEYS},
+        "has_tmdb_key": bool(config.get('tmdb_api_key'))
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode()).hexdigest()
+
+class ResultCache:
+    """
+    磁盘上的识别结果缓存 (data/recognition_cache.db)。
+    键 = 路径 + 文件大小 + mtime + 批次上下文指纹，按最近访问时间做 LRU 淘汰。
+    连接不跨线程共享，应在使用它的线程内创建。
+    """
+    def __init__(self, path=RESULT_CACHE_PATH, max_entries=50000):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, path TEXT, data TEXT, logs BLOB, last_access REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_results_access ON results (last_access)")
+        self._touched = []
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def file_key(path, context):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        raw = f"{os.path.normcase(os.path.abspath(path))}|{st.st_size}|{st.st_mtime_ns}|{context}"
+        return hashlib.sha1(raw.encode("utf-8", "surrogateescape")).hexdigest()
+
+    def get(self, key):
+        """返回 (data, logs) 或 None"""
+        if key is None:
+            return None
+        row = self.conn.execute("SELECT data, logs FROM results WHERE key = ?", (key,)).fetchone()
+        if not row:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touched.append((time.time(), key))
+        return json.loads(row[0]), json.loads(zlib.decompress(row[1]).decode())
+
+    def put(self, key, path, data, logs):
+        if key is None:
+            return
+        blob = zlib.compress(json.dumps(logs, ensure_ascii=False).encode())
+        self.conn.execute(
+            "INSERT OR REPLACE INTO results (key, path, data, logs, last_access) VALUES (?, ?, ?, ?, ?)",
+            (key, path, json.dumps(data, ensure_ascii=False), blob, time.time())
+        )
+
+    def flush(self):
+        """批量写回访问时间并按容量淘汰最久未访问的条目"""
+        if self._touched:
+            self.conn.executemany("UPDATE results SET last_access = ? WHERE key = ?", self._touched)
+            self._touched = []
+        count = self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        if count > self.max_entries:
+            self.conn.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_access LIMIT ?)",
+                (count - self.max_entries,)
+            )
+        self.conn.commit()
+
+    def clear(self):
+        self.conn.execute("DELETE FROM results")
+        self.conn.commit()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
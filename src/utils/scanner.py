@@ -0,0 +1,51 @@
+import os
+import time
+
+VIDEO_EXTENSIONS = ['.mkv', '.mp4', '.avi', '.mov', '.wmv', '.ts', '.flv', '.webm', '.mpg', '.mpeg']
+# NAS / 系统自动生成的目录，默认不进入
+DEFAULT_SKIP_DIRS = ['@eaDir', '#recycle', '.@__thumb', '$RECYCLE.BIN', 'System Volume Information']
+
+def parse_skip_dirs(text):
+    """设置中以逗号/分号/换行分隔的跳过目录名"""
+    for sep in (';', '\n'):
+        text = text.replace(sep, ',')
+    return [name.strip() for name in text.split(',') if name.strip()]
+
+def scan_videos(roots, extensions=VIDEO_EXTENSIONS, skip_dirs=DEFAULT_SKIP_DIRS, should_stop=None,
+                batch_size=500, batch_interval=0.2):
+    """
+    基于 os.scandir 的流式目录扫描 (不依赖 Qt)。
+    逐批 yield 匹配扩展名的视频路径：凑满 batch_size 或距上一批超过 batch_interval 秒即交付，
+    慢速网络共享上也能边扫边显示。目录按名称排序深度优先遍历，不跟随目录软链接以免成环。
+    """
+    exts = {e.lower() for e in extensions}
+    skip = {os.path.normcase(name) for name in skip_dirs}
+    stack = [os.path.normpath(r) for r in reversed(list(roots))]
+    batch, last = [], time.monotonic()
+    while stack:
+        if should_stop and should_stop(): return
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if os.path.normcase(entry.name) not in skip:
+                        subdirs.append(entry.path)
+                elif os.path.splitext(entry.name)[1].lower() in exts:
+                    batch.append(entry.path)
+            except OSError:
+                continue
+            if len(batch) >= batch_size:
+                yield batch
+                batch, last = [], time.monotonic()
+        stack.extend(reversed(subdirs))
+        if batch and time.monotonic() - last >= batch_interval:
+            yield batch
+            batch, last = [], time.monotonic()
+    if batch:
+        yield batch
@@ -0,0 +1,91 @@
+import os
+import json
+import math
+import time
+import threading
+from contextlib import contextmanager
+from src.utils.paths import TRACE_DIR
+
+def percentile(sorted_values, p):
+    """最近秩百分位，sorted_values 需已升序排列"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+class Tracer:
+    """
+    批次级的分阶段计时。
+    每个 span 记录 (阶段名, 所属文件/分组, 开始时间戳, 耗时秒, 附加参数)，
+    可按文件查看、按阶段汇总 p50/p95/max，并导出为 Chrome trace (chrome://tracing / Perfetto)。
+    """
+    def __init__(self):
+        self.spans = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, file=None, **args):
+        start, t0 = time.time(), time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter() - t0, file, **args)
+
+    def add(self, name, start, duration, file=None, **args):
+        with self._lock:
+            self.spans.append((name, file, start, duration, args))
+
+    def extend(self, spans):
+        """合并其它进程 (L1 进程池) 传回的 span 列表"""
+        with self._lock:
+            self.spans.extend(tuple(s) for s in spans)
+
+    def pop_all(self):
+        with self._lock:
+            spans, self.spans = self.spans, []
+        return spans
+
+    def by_file(self):
+        """{文件: {阶段: 累计秒}}"""
+        result = {}
+        for name, file, _, duration, _ in list(self.spans):
+            stages = result.setdefault(file, {})
+            stages[name] = stages.get(name, 0.0) + duration
+        return result
+
+    def summary(self):
+        """{阶段: {count, total, p50, p95, max}}，单位为秒"""
+        durations = {}
+        for name, _, _, duration, _ in list(self.spans):
+            durations.setdefault(name, []).append(duration)
+        result = {}
+        for name, values in durations.items():
+            values.sort()
+            result[name] = {"count": len(values), "total": sum(values), "p50": percentile(values, 50),
+                            "p95": percentile(values, 95), "max": values[-1]}
+        return result
+
+    def summary_lines(self):
+        lines = []
+        for name, s in sorted(self.summary().items(), key=lambda kv: -kv[1]["total"]):
+            lines.append(f"{name}: n={s['count']} 合计 {s['total']:.2f}s | p50 {s['p50'] * 1000:.1f}ms"
+                         f" | p95 {s['p95'] * 1000:.1f}ms | max {s['max'] * 1000:.1f}ms")
+        return lines
+
+    def export_chrome(self, path=None):
+        """导出 Chrome trace JSON：每个文件/分组占一条时间线，批次级阶段在第 0 条"""
+        if path is None:
+            os.makedirs(TRACE_DIR, exist_ok=True)
+            path = os.path.join(TRACE_DIR, f"trace-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        lanes, events, pid = {None: 0}, [], os.getpid()
+        for name, file, start, duration, args in list(self.spans):
+            tid = lanes.setdefault(file, len(lanes))
+            events.append({"name": name, "cat": name.split(".")[0], "ph": "X", "pid": pid, "tid": tid,
+                           "ts": int(start * 1e6), "dur": max(1, int(duration * 1e6)),
+                           "args": dict(args, file=file) if file else args})
+        events.extend({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                       "args": {"name": os.path.basename(file) if file else "batch"}} for file, tid in lanes.items())
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"summary": self.summary()}},
+                      f, ensure_ascii=False)
+        return path
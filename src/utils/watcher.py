@@ -0,0 +1,202 @@
+import os
+import sys
+import time
+import errno
+import struct
+import ctypes
+import ctypes.util
+from src.utils.scanner import VIDEO_EXTENSIONS, DEFAULT_SKIP_DIRS, scan_videos
+
+# inotify 常量 (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+# 不监听 IN_MODIFY：大文件下载期间会产生海量事件，写入是否结束交给 StabilityTracker 判断
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+_EVENT = struct.Struct("iIII")
+
+# 下载器的控制/临时文件：存在 "视频名 + 后缀" 的同名文件时视为仍在下载
+IN_PROGRESS_SUFFIXES = (".aria2", ".part", ".!qB", ".!ut", ".crdownload", ".downloading")
+
+def watch_dirs_from_text(text):
+    """设置中以分号或换行分隔的监控目录 (路径本身可能含逗号)"""
+    return [p.strip() for p in text.replace("\n", ";").split(";") if p.strip()]
+
+def is_video(path):
+    return os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS
+
+class InotifyWatcher:
+    """
+    基于 Linux inotify 的递归目录监控，通过 ctypes 调用 libc，无第三方依赖。
+    新建的子目录会自动补加监控，并返回补加前已写入其中的文件，避免竞态漏报。
+    """
+    def __init__(self, roots, skip_dirs=DEFAULT_SKIP_DIRS):
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOSYS, "inotify 仅在 Linux 上可用")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self.skip = {os.path.normcase(name) for name in skip_dirs}
+        self.overflowed = False
+        self._dirs = {}
+        try:
+            for root in roots:
+                self.add_tree(os.path.abspath(root))
+        except OSError:
+            self.close()
+            raise
+
+    def fileno(self):
+        return self.fd
+
+    def _add(self, directory):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:  # 超出 fs.inotify.max_user_watches，交由调用方退回轮询
+                raise OSError(err, "inotify 监控数已达上限 (fs.inotify.max_user_watches)")
+            return False
+        self._dirs[wd] = directory
+        return True
+
+    def add_tree(self, directory):
+        """递归监控 directory，返回其中已有的文件"""
+        files, stack = [], [directory]
+        while stack:
+            current = stack.pop()
+            if not self._add(current):
+                continue
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            if os.path.normcase(entry.name) not in self.skip:
+                                stack.append(entry.path)
+                        else:
+                            files.append(entry.path)
+            except OSError:
+                continue
+        return files
+
+    def read(self):
+        """读出当前已到达的事件，返回新出现或写入结束的文件路径列表"""
+        paths = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    self.overflowed = True  # 事件队列溢出，调用方需重新扫描
+                    continue
+                if mask & IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                    continue
+                directory = self._dirs.get(wd)
+                if directory is None or not name:
+                    continue
+                path = os.path.join(directory, name)
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) and os.path.normcase(name) not in self.skip:
+                        paths.extend(self.add_tree(path))
+                else:
+                    paths.append(path)
+        return paths
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+class PollingWatcher:
+    """inotify 不可用 (非 Linux、监控数上限) 时的退路：每隔 interval 秒列举一次目录，返回新增或变化的视频"""
+    def __init__(self, roots, skip_dirs=DEFAULT_SKIP_DIRS, interval=30.0):
+        self.roots = [os.path.abspath(r) for r in roots]
+        self.skip_dirs = skip_dirs
+        self.interval = interval
+        self.overflowed = False
+        self._seen = self._scan()
+        self._last = time.monotonic()
+
+    def fileno(self):
+        return None
+
+    def _scan(self):
+        seen = {}
+        for batch in scan_videos(self.roots, skip_dirs=self.skip_dirs):
+            for path in batch:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                seen[path] = (st.st_size, st.st_mtime_ns)
+        return seen
+
+    def read(self):
+        if time.monotonic() - self._last < self.interval:
+            return []
+        current = self._scan()
+        self._last = time.monotonic()
+        changed = [path for path, sig in current.items() if self._seen.get(path) != sig]
+        self._seen = current
+        return changed
+
+    def close(self):
+        pass
+
+def create_watcher(roots, skip_dirs=DEFAULT_SKIP_DIRS, poll_interval=30.0):
+    """优先 inotify，不可用时退回轮询；返回 (监控器, 退回原因或 None)"""
+    try:
+        return InotifyWatcher(roots, skip_dirs), None
+    except (OSError, AttributeError) as e:
+        return PollingWatcher(roots, skip_dirs, poll_interval), str(e)
+
+class StabilityTracker:
+    """
+    写入完成判定：文件的 (大小, mtime) 连续 window 秒不变，且没有下载器的同名控制/临时文件。
+    touch() 登记或重置一个文件，poll() 返回已稳定的文件并将其移出跟踪。
+    """
+    def __init__(self, window=10.0):
+        self.window = window
+        self.pending = {}
+
+    def touch(self, path, now=None):
+        self.pending[path] = (None, time.monotonic() if now is None else now)
+
+    def __len__(self):
+        return len(self.pending)
+
+    def poll(self, now=None):
+        now = time.monotonic() if now is None else now
+        ready = []
+        for path, (sig, since) in list(self.pending.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self.pending[path]  # 已被删除或改名，改名后的新路径会有自己的事件
+                continue
+            current = (st.st_size, st.st_mtime_ns)
+            if current != sig:
+                self.pending[path] = (current, now)
+            elif now - since >= self.window and not any(os.path.exists(path + s) for s in IN_PROGRESS_SUFFIXES):
+                del self.pending[path]
+                ready.append(path)
+        return ready